@@ -7,9 +7,10 @@ from typing import Optional
 
 from app.core.database import get_db
 from app.services.cache_service import (
-    get_sentiment_trend,
+    get_sentiment_overview,
     get_prediction_history,
     get_prediction_accuracy,
+    get_prediction_accuracy_bulk,
     evaluate_past_predictions
 )
 from app.services.index_service import fetch_index_data
@@ -25,15 +26,17 @@ def get_sentiment_history(
 ):
     """
     Get sentiment analysis history for an index over time.
-    Shows how sentiment has changed over the specified period.
+    Shows how sentiment has changed over the specified period,
+    along with the latest analysis if it is still fresh.
     """
-    trend = get_sentiment_trend(db, index_id, days=days)
+    latest, trend = get_sentiment_overview(db, index_id, days=days)
     
     if not trend:
         return {
             "index_id": index_id,
             "days": days,
             "message": "No sentiment history available yet. Analyze the index to start tracking.",
+            "latest": None,
             "data": []
         }
     
@@ -47,6 +50,7 @@ def get_sentiment_history(
         "total_analyses": len(trend),
         "average_score": round(avg_score, 4),
         "current_sentiment": trend[-1]["sentiment"] if trend else None,
+        "latest": latest,
         "data": trend
     }
 
@@ -90,14 +94,8 @@ def evaluate_predictions(
             detail=f"Unable to fetch data for {index_id}"
         )
     
-    # Create price map
-    actual_prices = {
-        point["date"]: point["close"]
-        for point in data["data"]
-    }
-    
     # Evaluate predictions
-    evaluate_past_predictions(db, index_id, actual_prices)
+    evaluate_past_predictions(db, index_id, data["data"])
     
     # Get updated accuracy
     accuracy = get_prediction_accuracy(db, index_id)
@@ -118,11 +116,7 @@ def get_all_accuracy_stats(
     """
     from app.core.config import settings
     
-    stats = {}
-    for index_id in settings.INDICES.keys():
-        accuracy = get_prediction_accuracy(db, index_id)
-        if accuracy["total_predictions"] > 0:
-            stats[index_id] = accuracy
+    stats, overall = get_prediction_accuracy_bulk(db, list(settings.INDICES.keys()))
     
     if not stats:
         return {
@@ -130,15 +124,11 @@ def get_all_accuracy_stats(
             "indices": {}
         }
     
-    # Calculate overall stats
-    total = sum(s["total_predictions"] for s in stats.values())
-    correct = sum(s["correct_predictions"] for s in stats.values())
-    
     return {
         "overall": {
-            "total_predictions": total,
-            "correct_predictions": correct,
-            "direction_accuracy": round(correct / total * 100, 2) if total > 0 else None
+            "total_predictions": overall["total_predictions"],
+            "correct_predictions": overall["correct_predictions"],
+            "direction_accuracy": overall["direction_accuracy"]
         },
         "by_index": stats
     }
@@ -1,22 +1,26 @@
 """
 API routes for index data and visualization
 """
-from fastapi import APIRouter, HTTPException, Query
-from typing import Optional, List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import Session
+from typing import Optional, List, Dict, Tuple
+import orjson
 from app.services.index_service import (
     get_all_indices,
-    fetch_index_data,
+    get_index_info,
+    get_index_history,
     fetch_realtime_quotes,
     get_index_summary
 )
 from app.core.config import settings
+from app.core.database import get_db
 
-router = APIRouter(prefix="/indices", tags=["Indices"])
+router = APIRouter(prefix="/indices", tags=["Indices"], default_response_class=ORJSONResponse)
 
 
-@router.get("/")
-def list_indices():
-    """Get list of all supported indices"""
+def _build_indices_payload() -> bytes:
+    """Serialize the list of supported indices, grouped by country"""
     indices = get_all_indices()
     
     # Group by country
@@ -27,32 +31,49 @@ def list_indices():
             by_country[country] = []
         by_country[country].append(idx)
     
-    return {
+    return orjson.dumps({
         "total": len(indices),
         "indices": indices,
         "by_country": by_country,
         "available_periods": settings.TIME_PERIODS,
         "available_intervals": settings.INTERVALS
-    }
+    })
+
+
+# Supported indices are fixed for the process lifetime, so serialize them once
+_INDICES_PAYLOAD = _build_indices_payload()
+
+
+@router.get("/")
+def list_indices():
+    """Get list of all supported indices"""
+    return Response(content=_INDICES_PAYLOAD, media_type="application/json")
 
 
-@router.get("/quotes")
-def get_realtime_quotes():
-    """Get real-time quotes for all indices"""
-    quotes = fetch_realtime_quotes()
-    return {
+@router.get("/quotes", response_model=None)
+def get_realtime_quotes(db: Session = Depends(get_db)):
+    """Get real-time quotes for all indices (cached for a short period)"""
+    quotes = fetch_realtime_quotes(db)
+    return ORJSONResponse({
         "total": len(quotes),
         "quotes": quotes
-    }
+    })
+
 
+# Serialized history responses, reused while their ETag (batch fetched_at) is unchanged.
+# Keys are bounded by the supported indices, periods and intervals.
+_history_payloads: Dict[Tuple[str, str, str], Tuple[str, bytes]] = {}
 
-@router.get("/{index_id}")
+
+@router.get("/{index_id}", response_model=None)
 def get_index_data(
     index_id: str,
+    request: Request,
     period: str = Query(default="1mo", description="Time period: 1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, max"),
-    interval: str = Query(default="1d", description="Data interval: 1m, 5m, 15m, 30m, 1h, 1d, 1wk, 1mo")
+    interval: str = Query(default="1d", description="Data interval: 1m, 5m, 15m, 30m, 1h, 1d, 1wk, 1mo"),
+    db: Session = Depends(get_db)
 ):
-    """Get historical data for a specific index"""
+    """Get historical data for a specific index (supports If-None-Match)"""
     
     # Validate period
     if period not in settings.TIME_PERIODS:
@@ -68,20 +89,44 @@ def get_index_data(
             detail=f"Invalid interval. Choose from: {settings.INTERVALS}"
         )
     
-    data = fetch_index_data(index_id, period=period, interval=interval)
+    series = get_index_history(db, index_id, period=period, interval=interval)
     
-    if not data:
+    if not series:
         raise HTTPException(
             status_code=404,
             detail=f"Index '{index_id}' not found or data unavailable"
         )
     
-    return data
+    etag = series.etag
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    index_info = get_index_info(index_id)
+    key = (index_info["id"], period, interval)
+    cached = _history_payloads.get(key)
+    if cached and cached[0] == etag:
+        content = cached[1]
+    else:
+        content = orjson.dumps({
+            "index_id": index_info["id"],
+            "name": index_info["name"],
+            "symbol": index_info["symbol"],
+            "country": index_info["country"],
+            "period": period,
+            "interval": interval,
+            "current_price": series.quote.get("current_price"),
+            "change": series.quote.get("change"),
+            "change_percent": series.quote.get("change_percent"),
+            "data": series.to_list()
+        })
+        _history_payloads[key] = (etag, content)
+    
+    return Response(content=content, media_type="application/json", headers={"ETag": etag})
 
 
 @router.get("/{index_id}/summary")
 def get_index_details(index_id: str):
-    """Get detailed summary for a specific index"""
+    """Get detailed summary for a specific index (cached for 5 minutes)"""
     summary = get_index_summary(index_id)
     
     if not summary:
@@ -1,23 +1,41 @@
 """
 API routes for predictions
 """
-from fastapi import APIRouter, HTTPException, Query, Depends
-from typing import Optional
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Depends
+from fastapi.responses import ORJSONResponse
+from typing import Optional, Dict, Any
 from sqlalchemy.orm import Session
 
 from app.services.prediction_service import generate_prediction, get_sentiment_analysis
-from app.core.database import get_db
+from app.core.database import get_db, SessionLocal
 from app.services.cache_service import log_prediction, save_sentiment_history
 
-router = APIRouter(prefix="/predict", tags=["Predictions"])
+router = APIRouter(prefix="/predict", tags=["Predictions"], default_response_class=ORJSONResponse)
 
 
-@router.get("/{index_id}")
+def _save_prediction_history(index_id: str, prediction: Dict[str, Any]):
+    """Log a prediction and its sentiment using a session scoped to this task"""
+    db = SessionLocal()
+    try:
+        log_prediction(db, index_id, prediction)
+        
+        # Also save sentiment history
+        if prediction.get("factors", {}).get("sentiment"):
+            sentiment_data = {**prediction["factors"]["sentiment"], "articles": []}  # Don't store full articles in log
+            save_sentiment_history(db, index_id, prediction.get("name", index_id), sentiment_data)
+    except Exception as e:
+        # Runs after the response is sent; just report the failure
+        print(f"Warning: Failed to log prediction: {e}")
+    finally:
+        db.close()
+
+
+@router.get("/{index_id}", response_model=None)
 def get_prediction(
     index_id: str,
+    background_tasks: BackgroundTasks,
     days: int = Query(default=7, ge=1, le=30, description="Number of days to predict (1-30)"),
-    save_to_history: bool = Query(default=True, description="Save prediction to history"),
-    db: Session = Depends(get_db)
+    save_to_history: bool = Query(default=True, description="Save prediction to history")
 ):
     """
     Generate price prediction for an index based on technical and sentiment analysis
@@ -27,7 +45,7 @@ def get_prediction(
     - News sentiment analysis using FinBERT
     - Volatility-adjusted forecasting
     
-    Predictions are automatically logged for future accuracy tracking.
+    Predictions are logged for future accuracy tracking after the response is sent.
     """
     prediction = generate_prediction(index_id, days=days)
     
@@ -37,21 +55,12 @@ def get_prediction(
             detail=f"Unable to generate prediction for '{index_id}'. Index not found or insufficient data."
         )
     
-    # Log prediction to database for accuracy tracking
+    # Log prediction to database for accuracy tracking, off the request path
     if save_to_history:
-        try:
-            log_prediction(db, index_id, prediction)
-            
-            # Also save sentiment history
-            if prediction.get("factors", {}).get("sentiment"):
-                sentiment_data = prediction["factors"]["sentiment"]
-                sentiment_data["articles"] = []  # Don't store full articles in log
-                save_sentiment_history(db, index_id, prediction.get("name", index_id), sentiment_data)
-        except Exception as e:
-            # Don't fail the request if logging fails
-            print(f"Warning: Failed to log prediction: {e}")
+        background_tasks.add_task(_save_prediction_history, index_id, prediction)
     
-    return prediction
+    # Serialize directly with orjson (handles NumPy scalars natively)
+    return ORJSONResponse(prediction)
 
 
 @router.get("/{index_id}/sentiment")
@@ -2,11 +2,15 @@
 API routes for sentiment analysis
 """
 from fastapi import APIRouter, HTTPException, Query
+import numpy as np
 from app.services.news_service import fetch_news
-from app.services.sentiment_service import analyze_sentiment
+from app.services.sentiment_service import LABEL_CODES, analyze_sentiment_batch
 
 router = APIRouter(prefix="/sentiment", tags=["Sentiment"])
 
+# Labels by signed code (unknown labels are scored as neutral)
+CODE_LABELS = {code: label for label, code in LABEL_CODES.items()}
+
 
 @router.get("/{symbol}")
 def sentiment_from_news(
@@ -26,44 +30,35 @@ def sentiment_from_news(
             detail=f"Error fetching news: {str(e)}"
         )
     
-    results = []
-    positive_count = 0
-    negative_count = 0
-    neutral_count = 0
-    total_score = 0
+    # Score all headlines in a single batched FinBERT call
+    articles = [article for article in articles[:limit] if article.get("title")]
+    sentiments = analyze_sentiment_batch([article["title"] for article in articles])
+
+    # Calculate scores (-1 to 1) and label counts as array operations
+    codes = np.fromiter(
+        (LABEL_CODES.get(s["sentiment"].lower(), 0) for s in sentiments), dtype=np.int8, count=len(sentiments)
+    )
+    confidences = np.fromiter((s["confidence"] for s in sentiments), dtype=np.float64, count=len(sentiments))
+    scores = codes * confidences
+    negative_count, neutral_count, positive_count = np.bincount(codes + 1, minlength=3).tolist()
 
-    for article in articles[:limit]:
-        if article.get("title"):
-            sentiment = analyze_sentiment(article["title"])
-            
-            # Calculate score (-1 to 1)
-            label = sentiment["sentiment"].lower()
-            confidence = sentiment["confidence"]
-            
-            if label == "positive":
-                score = confidence
-                positive_count += 1
-            elif label == "negative":
-                score = -confidence
-                negative_count += 1
-            else:
-                score = 0
-                neutral_count += 1
-            
-            total_score += score
-            
-            results.append({
-                "headline": article["title"],
-                "source": article.get("source", {}).get("name", "Unknown"),
-                "published_at": article.get("publishedAt"),
-                "url": article.get("url"),
-                "sentiment": label,
-                "confidence": round(confidence, 4),
-                "score": round(score, 4)
-            })
+    results = [
+        {
+            "headline": article["title"],
+            "source": article.get("source", {}).get("name", "Unknown"),
+            "published_at": article.get("publishedAt"),
+            "url": article.get("url"),
+            "sentiment": CODE_LABELS[code],
+            "confidence": round(confidence, 4),
+            "score": round(score, 4)
+        }
+        for article, code, confidence, score in zip(
+            articles, codes.tolist(), confidences.tolist(), scores.tolist()
+        )
+    ]
 
     # Calculate overall sentiment
-    avg_score = total_score / len(results) if results else 0
+    avg_score = float(scores.mean()) if results else 0
     
     if avg_score > 0.1:
         overall_sentiment = "positive"
@@ -14,9 +14,32 @@ class Settings:
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./sentilytics.db")
     
+    # Database connection pool: at most DB_POOL_SIZE + DB_MAX_OVERFLOW connections
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "20"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "40"))
+    
+    # Worker threads available to sync route handlers (AnyIO default is 40). Each one
+    # may hold a pooled connection, so this is capped at the pool's capacity; extra
+    # threads would only wait on the pool and fail after its 5 s timeout
+    THREADPOOL_SIZE: int = min(
+        int(os.getenv("THREADPOOL_SIZE", "60")),
+        DB_POOL_SIZE + DB_MAX_OVERFLOW
+    )
+    
     # News API
     NEWS_API_KEY: str = os.getenv("NEWS_API_KEY", "")
     
+    # FinBERT inference precision: "fp32", "fp16", "bf16", "int8" (dynamic quantization of
+    # Linear layers, CPU only) or "auto" for fp16 on CUDA and int8 on CPU
+    FINBERT_PRECISION: str = os.getenv("FINBERT_PRECISION", "auto").lower()
+    
+    # FinBERT inference: torch.compile the PyTorch model (slower startup, faster forward passes)
+    FINBERT_COMPILE: bool = os.getenv("FINBERT_COMPILE", "false").lower() == "true"
+    
+    # FinBERT runtime: "torch", or "onnx" for an INT8-quantized ONNX Runtime export (needs optimum[onnxruntime])
+    FINBERT_BACKEND: str = os.getenv("FINBERT_BACKEND", "torch").lower()
+    FINBERT_ONNX_DIR: str = os.getenv("FINBERT_ONNX_DIR", "./models/finbert-onnx")
+    
     # Supported Indices with their Yahoo Finance symbols and display names
     INDICES: dict = {
         # Indian Indices
@@ -3,10 +3,11 @@ Sentilytics - Market Index Analytics with News Sentiment Prediction
 """
 from fastapi import FastAPI, Depends
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from pathlib import Path
+import anyio
 import os
 
 from app.api import indices, sentiment, predictions, history
@@ -17,6 +18,10 @@ from app.core.database import init_db, get_db
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Initialize resources on startup"""
+    # Route handlers are sync and block on yfinance/NewsAPI/DB calls, so they
+    # run in AnyIO's worker threadpool; raise its cap for concurrent requests
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+    
     # Initialize database tables
     try:
         init_db()
@@ -36,6 +41,7 @@ app = FastAPI(
     description=settings.APP_DESCRIPTION,
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
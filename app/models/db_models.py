@@ -1,8 +1,10 @@
 """
 SQLAlchemy database models for caching and history tracking
 """
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, JSON, Boolean, Index
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, Text, JSON, Boolean, Index, LargeBinary
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import deferred
+from sqlalchemy.sql import func, text
 from app.core.database import Base
 
 
@@ -18,7 +20,7 @@ class CachedIndexData(Base):
     high_price = Column(Float)
     low_price = Column(Float)
     close_price = Column(Float)
-    volume = Column(Integer)
+    volume = Column(BigInteger)
     change_percent = Column(Float)
     
     # Cache metadata
@@ -28,7 +30,41 @@ class CachedIndexData(Base):
     
     __table_args__ = (
         Index('idx_index_date', 'index_id', 'date'),
-        Index('idx_index_period', 'index_id', 'period', 'interval'),
+        # Covers the latest-batch lookup: equality on the config, MAX/equality on fetched_at
+        Index('idx_index_period_fetched', 'index_id', 'period', 'interval', 'fetched_at'),
+    )
+
+
+class CachedIndexBatch(Base):
+    """Latest cached OHLCV batch per index configuration, stored column-wise"""
+    __tablename__ = "cached_index_batches"
+
+    id = Column(Integer, primary_key=True, index=True)
+    index_id = Column(String(50), nullable=False)
+    symbol = Column(String(20), nullable=False)
+    period = Column(String(10), nullable=False)
+    interval = Column(String(10), nullable=False)
+    points = Column(Integer, nullable=False)  # Length of every column array
+    
+    # Little-endian NumPy buffers: int64 epoch seconds, float64 prices, int64 volumes
+    dates = Column(LargeBinary, nullable=False)
+    opens = Column(LargeBinary, nullable=False)
+    highs = Column(LargeBinary, nullable=False)
+    lows = Column(LargeBinary, nullable=False)
+    closes = Column(LargeBinary, nullable=False)
+    volumes = Column(LargeBinary, nullable=False)
+    changes = Column(LargeBinary, nullable=False)
+    
+    # Quote at fetch time, returned alongside the series
+    current_price = Column(Float)
+    change = Column(Float)
+    change_percent = Column(Float)
+    
+    fetched_at = Column(DateTime, default=func.now())
+    fingerprint = Column(String(16))  # Hash of the packed columns, to detect unchanged refetches
+    
+    __table_args__ = (
+        Index('idx_batch_config', 'index_id', 'period', 'interval', unique=True),
     )
 
 
@@ -50,8 +86,8 @@ class SentimentHistory(Base):
     negative_count = Column(Integer, default=0)
     neutral_count = Column(Integer, default=0)
     
-    # Detailed results (JSON)
-    articles = Column(JSON)  # List of article sentiment results
+    # Detailed results (JSON), deferred since only the cached-sentiment lookup reads it
+    articles = deferred(Column(JSON))  # List of article sentiment results
     
     analyzed_at = Column(DateTime, default=func.now(), index=True)
     
@@ -60,6 +96,18 @@ class SentimentHistory(Base):
     )
 
 
+class HeadlineSentiment(Base):
+    """FinBERT result per headline, shared across workers and restarts"""
+    __tablename__ = "headline_sentiments"
+
+    id = Column(Integer, primary_key=True, index=True)
+    headline_hash = Column(String(40), nullable=False, unique=True)  # SHA-1 of the headline text
+    sentiment = Column(String(20), nullable=False)  # positive, negative, neutral
+    confidence = Column(Float, nullable=False)
+    
+    analyzed_at = Column(DateTime, default=func.now(), index=True)
+
+
 class PredictionLog(Base):
     """Log predictions to track accuracy over time"""
     __tablename__ = "prediction_logs"
@@ -82,9 +130,9 @@ class PredictionLog(Base):
     predicted_change_percent = Column(Float)
     confidence = Column(Float)
     
-    # Analysis factors (stored as JSON)
-    technical_factors = Column(JSON)
-    sentiment_factors = Column(JSON)
+    # Analysis factors (stored as JSONB on PostgreSQL)
+    technical_factors = Column(JSON().with_variant(JSONB(), "postgresql"))
+    sentiment_factors = Column(JSON().with_variant(JSONB(), "postgresql"))
     combined_signal = Column(Float)
     
     # Accuracy tracking (filled after target date)
@@ -97,7 +145,19 @@ class PredictionLog(Base):
     
     __table_args__ = (
         Index('idx_prediction_index_target', 'index_id', 'target_date'),
-        Index('idx_prediction_pending', 'actual_price'),  # Find unevaluated predictions
+        Index('idx_prediction_index_date', 'index_id', 'prediction_date'),
+        # Find unevaluated predictions: partial index over pending rows only, covering
+        # the columns read by evaluate_past_predictions for index-only scans
+        Index(
+            'idx_prediction_pending', 'index_id', 'target_date',
+            postgresql_where=text("actual_price IS NULL"),
+            postgresql_include=['id', 'current_price', 'predicted_price', 'predicted_direction']
+        ),
+        Index(
+            'idx_prediction_sentiment_factors', 'sentiment_factors',
+            postgresql_using='gin',
+            postgresql_ops={'sentiment_factors': 'jsonb_path_ops'}
+        ),
     )
 
 
@@ -116,14 +176,15 @@ class IndexQuoteCache(Base):
     previous_close = Column(Float)
     change = Column(Float)
     change_percent = Column(Float)
-    volume = Column(Integer)
+    volume = Column(BigInteger)
+    market_cap = Column(Float)
     day_high = Column(Float)
     day_low = Column(Float)
     fifty_two_week_high = Column(Float)
     fifty_two_week_low = Column(Float)
     
-    # Cache timestamp
-    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    # Cache timestamp (set explicitly by the quote cache UPSERT)
+    updated_at = Column(DateTime, default=func.now())
 
 
 class UserWatchlist(Base):
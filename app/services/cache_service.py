@@ -1,14 +1,22 @@
 """
 Cache service for database operations
 """
+import hashlib
+import threading
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator, Set, Tuple
+import numpy as np
+import pandas as pd
+from cachetools import TTLCache
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import and_, desc, func, case, select, lambda_stmt, update, delete, tuple_, values, column, true, false, DateTime, Float
 
 from app.models.db_models import (
-    CachedIndexData,
+    CachedIndexBatch,
     SentimentHistory,
+    HeadlineSentiment,
     PredictionLog,
     IndexQuoteCache
 )
@@ -16,71 +24,167 @@ from app.models.db_models import (
 
 # Cache TTL configurations (in minutes)
 CACHE_TTL = {
-    "quote": 5,           # Real-time quotes: 5 minutes
     "daily_data": 60,     # Daily historical data: 1 hour
     "intraday_data": 15,  # Intraday data: 15 minutes
     "sentiment": 30,      # Sentiment analysis: 30 minutes
+    "headline_sentiment": 24 * 60,  # Per-headline FinBERT results: 24 hours
 }
 
 
+# Read-through window for real-time quotes; older rows are re-fetched from Yahoo
+REALTIME_QUOTE_TTL = timedelta(seconds=20)
+
+
+# In-process L1 in front of the index data cache so repeat lookups skip the
+# round-trip; entries are replaced whenever the database copy is rewritten
+L1_TTL = 30  # seconds
+_l1_index_data = TTLCache(maxsize=1024, ttl=L1_TTL)
+_l1_lock = threading.Lock()
+
+
+# TTLs as timedeltas, built once rather than on every validity check
+_CACHE_TTL_DELTAS = {cache_type: timedelta(minutes=minutes) for cache_type, minutes in CACHE_TTL.items()}
+_DEFAULT_TTL = timedelta(minutes=60)
+
+
 def is_cache_valid(fetched_at: datetime, cache_type: str) -> bool:
     """Check if cached data is still valid"""
     if not fetched_at:
         return False
-    ttl_minutes = CACHE_TTL.get(cache_type, 60)
-    expiry = fetched_at + timedelta(minutes=ttl_minutes)
-    return datetime.now() < expiry
+    return datetime.now() - fetched_at < _CACHE_TTL_DELTAS.get(cache_type, _DEFAULT_TTL)
 
 
 # ============== Index Data Cache ==============
 
+INTRADAY_INTERVALS = frozenset({"1m", "5m", "15m", "30m", "1h"})
+INTRADAY_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+DAILY_DATE_FORMAT = "%Y-%m-%d"
+
+# Packed columns of a cached batch, in the order they are fingerprinted
+INDEX_COLUMNS = ("dates", "opens", "highs", "lows", "closes", "volumes", "changes")
+
+
+def index_data_fingerprint(columns: Dict[str, bytes]) -> Optional[str]:
+    """Fingerprint of a whole series, hashed over its packed column buffers"""
+    if not columns["dates"]:
+        return None
+    digest = hashlib.blake2b(digest_size=8)
+    for name in INDEX_COLUMNS:
+        digest.update(columns[name])
+    return digest.hexdigest()
+
+
+@dataclass
+class CachedSeries:
+    """
+    Cached OHLCV points kept as raw row tuples
+    
+    Dicts are only built when the series is iterated or indexed, so callers
+    that work column-wise (or just check for a hit) skip that allocation.
+    """
+    columns: Tuple[str, ...]
+    rows: List[Tuple[Any, ...]]
+    fetched_at: datetime
+    quote: Dict[str, Any] = field(default_factory=dict)  # current_price, change, change_percent
+    
+    @property
+    def etag(self) -> str:
+        """Validator for HTTP caching; changes whenever the batch is re-fetched"""
+        return f'"{hashlib.md5(self.fetched_at.isoformat().encode()).hexdigest()}"'
+    
+    def __len__(self) -> int:
+        return len(self.rows)
+    
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        columns = self.columns
+        return (dict(zip(columns, row)) for row in self.rows)
+    
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        return dict(zip(self.columns, self.rows[i]))
+    
+    def to_list(self) -> List[Dict[str, Any]]:
+        return list(self)
+    
+    @classmethod
+    def from_points(
+        cls,
+        data: List[Dict[str, Any]],
+        fetched_at: datetime,
+        quote: Optional[Dict[str, Any]] = None
+    ) -> "CachedSeries":
+        """Build a series from point dicts as returned by fetch_index_data"""
+        return cls(
+            columns=SERIES_COLUMNS,
+            rows=[tuple(point.get(column) for column in SERIES_COLUMNS) for point in data],
+            fetched_at=fetched_at,
+            quote=quote or {}
+        )
+
+
+SERIES_COLUMNS = ("date", "open", "high", "low", "close", "volume", "change_percent")
+
+
 def get_cached_index_data(
     db: Session,
     index_id: str,
     period: str,
     interval: str
-) -> Optional[List[Dict[str, Any]]]:
+) -> Optional[CachedSeries]:
     """Get cached index data if available and valid"""
     
-    # Get the most recent cache entry for this configuration
-    latest = db.query(CachedIndexData).filter(
-        and_(
-            CachedIndexData.index_id == index_id.upper(),
-            CachedIndexData.period == period,
-            CachedIndexData.interval == interval
-        )
-    ).order_by(desc(CachedIndexData.fetched_at)).first()
+    index_id = index_id.upper()
+    intraday = interval in INTRADAY_INTERVALS
+    cache_type = "intraday_data" if intraday else "daily_data"
+    
+    with _l1_lock:
+        cached = _l1_index_data.get((index_id, period, interval))
+    if cached is not None and is_cache_valid(cached.fetched_at, cache_type):
+        return cached
+    
+    # The latest batch is a single columnar row; lambda_stmt caches the
+    # statement construction as well as its compiled form.
+    stmt = lambda_stmt(lambda: select(CachedIndexBatch).where(
+        CachedIndexBatch.index_id == index_id,
+        CachedIndexBatch.period == period,
+        CachedIndexBatch.interval == interval
+    ))
     
-    if not latest:
+    batch = db.execute(stmt).scalars().first()
+    
+    if not batch:
         return None
     
     # Check if cache is valid
-    cache_type = "intraday_data" if interval in ["1m", "5m", "15m", "30m", "1h"] else "daily_data"
-    if not is_cache_valid(latest.fetched_at, cache_type):
+    if not is_cache_valid(batch.fetched_at, cache_type):
         return None
     
-    # Get all data points
-    data_points = db.query(CachedIndexData).filter(
-        and_(
-            CachedIndexData.index_id == index_id.upper(),
-            CachedIndexData.period == period,
-            CachedIndexData.interval == interval,
-            CachedIndexData.fetched_at == latest.fetched_at
-        )
-    ).order_by(CachedIndexData.date).all()
+    # Decode each column in one shot, formatting all dates in one pass
+    date_format = INTRADAY_DATE_FORMAT if intraday else DAILY_DATE_FORMAT
+    dates = pd.to_datetime(_unpack(batch.dates, "<i8"), unit="s").strftime(date_format).tolist()
+    changes = [None if change != change else change for change in _unpack(batch.changes, "<f8").tolist()]
     
-    return [
-        {
-            "date": point.date.strftime("%Y-%m-%d %H:%M:%S") if interval in ["1m", "5m", "15m", "30m", "1h"] else point.date.strftime("%Y-%m-%d"),
-            "open": point.open_price,
-            "high": point.high_price,
-            "low": point.low_price,
-            "close": point.close_price,
-            "volume": point.volume,
-            "change_percent": point.change_percent
+    series = CachedSeries(
+        columns=SERIES_COLUMNS,
+        rows=list(zip(
+            dates,
+            _unpack(batch.opens, "<f8").tolist(),
+            _unpack(batch.highs, "<f8").tolist(),
+            _unpack(batch.lows, "<f8").tolist(),
+            _unpack(batch.closes, "<f8").tolist(),
+            _unpack(batch.volumes, "<i8").tolist(),
+            changes
+        )),
+        fetched_at=batch.fetched_at,
+        quote={
+            "current_price": batch.current_price,
+            "change": batch.change,
+            "change_percent": batch.change_percent
         }
-        for point in data_points
-    ]
+    )
+    
+    with _l1_lock:
+        _l1_index_data[(index_id, period, interval)] = series
+    return series
 
 
 def cache_index_data(
@@ -89,79 +193,171 @@ def cache_index_data(
     symbol: str,
     period: str,
     interval: str,
-    data: List[Dict[str, Any]]
-):
-    """Cache index data to database"""
+    data: List[Dict[str, Any]],
+    quote: Optional[Dict[str, Any]] = None
+) -> CachedSeries:
+    """
+    Cache index data to database
+    
+    The latest batch is stored column-wise in CachedIndexBatch, one row per
+    (index, period, interval). If the data matches the fingerprint of the
+    cached batch, only its fetched_at and quote are refreshed.
+    
+    Returns the written batch as a CachedSeries.
+    """
     fetched_at = datetime.now()
+    quote = {key: (quote or {}).get(key) for key in ("current_price", "change", "change_percent")}
+    series = CachedSeries.from_points(data, fetched_at, quote)
     
-    # Delete old cache entries for this configuration (keep last 3)
-    old_entries = db.query(CachedIndexData).filter(
-        and_(
-            CachedIndexData.index_id == index_id.upper(),
-            CachedIndexData.period == period,
-            CachedIndexData.interval == interval
-        )
-    ).order_by(desc(CachedIndexData.fetched_at)).all()
-    
-    # Group by fetched_at and delete old batches
-    seen_batches = set()
-    for entry in old_entries:
-        batch_key = entry.fetched_at.isoformat()
-        if batch_key not in seen_batches:
-            seen_batches.add(batch_key)
-        if len(seen_batches) > 3:
-            db.delete(entry)
-    
-    # Add new cache entries
-    for point in data:
-        cache_entry = CachedIndexData(
-            index_id=index_id.upper(),
-            symbol=symbol,
-            date=datetime.strptime(point["date"].split()[0], "%Y-%m-%d") if isinstance(point["date"], str) else point["date"],
-            open_price=point["open"],
-            high_price=point["high"],
-            low_price=point["low"],
-            close_price=point["close"],
-            volume=point["volume"],
-            change_percent=point.get("change_percent"),
-            period=period,
-            interval=interval,
-            fetched_at=fetched_at
+    # Parse all dates in one vectorized call (cache=True dedupes repeated values);
+    # ISO8601 accepts both daily and intraday ("%Y-%m-%d %H:%M:%S") dates
+    dates = pd.to_datetime(
+        [point["date"] for point in data],
+        format="ISO8601",
+        cache=True
+    )
+    
+    # Columnar copy of the batch; hashing every column catches revised earlier bars
+    columns = {
+        "dates": dates.values.astype("datetime64[s]").astype("<i8").tobytes(),
+        "opens": _pack([point["open"] for point in data], "<f8"),
+        "highs": _pack([point["high"] for point in data], "<f8"),
+        "lows": _pack([point["low"] for point in data], "<f8"),
+        "closes": _pack([point["close"] for point in data], "<f8"),
+        "volumes": _pack([point["volume"] for point in data], "<i8"),
+        "changes": _pack([point.get("change_percent") for point in data], "<f8"),
+    }
+    fingerprint = index_data_fingerprint(columns)
+    batch_filters = and_(
+        CachedIndexBatch.index_id == index_id.upper(),
+        CachedIndexBatch.period == period,
+        CachedIndexBatch.interval == interval
+    )
+    
+    cached_fingerprint = db.scalar(select(CachedIndexBatch.fingerprint).where(batch_filters))
+    
+    if fingerprint and cached_fingerprint == fingerprint:
+        db.query(CachedIndexBatch).filter(batch_filters).update(
+            {CachedIndexBatch.fetched_at: fetched_at, **quote}, synchronize_session=False
         )
-        db.add(cache_entry)
+        db.commit()
+        _store_l1(_l1_index_data, (index_id.upper(), period, interval), series)
+        return series
+    
+    # Replace the cached batch
+    batch = {
+        "index_id": index_id.upper(),
+        "symbol": symbol,
+        "period": period,
+        "interval": interval,
+        "points": len(data),
+        **columns,
+        **quote,
+        "fetched_at": fetched_at,
+        "fingerprint": fingerprint
+    }
+    stmt = insert(CachedIndexBatch).values(batch)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CachedIndexBatch.index_id, CachedIndexBatch.period, CachedIndexBatch.interval],
+        set_={key: stmt.excluded[key] for key in batch if key not in ("index_id", "period", "interval")}
+    )
+    db.execute(stmt)
     
     db.commit()
+    _store_l1(_l1_index_data, (index_id.upper(), period, interval), series)
+    return series
 
 
-# ============== Sentiment History ==============
+def _store_l1(cache: TTLCache, key: Any, value: Any):
+    """Replace an L1 entry with the value just written to the database"""
+    with _l1_lock:
+        cache[key] = value
 
-def get_cached_sentiment(
-    db: Session,
-    index_id: str
-) -> Optional[Dict[str, Any]]:
-    """Get cached sentiment if available and valid"""
+
+def _pack(values: List[Any], dtype: str) -> bytes:
+    """Serialize a column to a NumPy buffer (None becomes NaN in float columns)"""
+    return np.array(values, dtype=dtype).tobytes()
+
+
+def _unpack(blob: bytes, dtype: str) -> np.ndarray:
+    """Read a column serialized by _pack without copying"""
+    return np.frombuffer(blob, dtype=dtype)
+
+
+# ============== Quote Cache ==============
+
+def get_cached_quotes(db: Session) -> Tuple[Dict[str, Dict[str, Any]], Set[str]]:
+    """
+    Get every cached real-time quote by index id, plus the ids still fresh
     
-    latest = db.query(SentimentHistory).filter(
-        SentimentHistory.index_id == index_id.upper()
-    ).order_by(desc(SentimentHistory.analyzed_at)).first()
+    Rows outside the REALTIME_QUOTE_TTL window are returned too so callers
+    can fall back to them when a refetch fails, but they are not in the
+    fresh set.
+    """
+    rows = db.execute(select(IndexQuoteCache).order_by(IndexQuoteCache.id)).scalars().all()
     
-    if not latest:
-        return None
+    cutoff = datetime.now() - REALTIME_QUOTE_TTL
+    fresh = {row.index_id for row in rows if row.updated_at and row.updated_at > cutoff}
     
-    if not is_cache_valid(latest.analyzed_at, "sentiment"):
-        return None
-    
-    return {
-        "score": latest.sentiment_score,
-        "label": latest.overall_sentiment,
-        "positive_count": latest.positive_count,
-        "negative_count": latest.negative_count,
-        "neutral_count": latest.neutral_count,
-        "articles": latest.articles or [],
-        "cached_at": latest.analyzed_at.isoformat()
+    quotes = {
+        row.index_id: {
+            "id": row.index_id,
+            "name": row.name,
+            "symbol": row.symbol,
+            "country": row.country,
+            "price": row.current_price,
+            "change": row.change,
+            "change_percent": row.change_percent,
+            "volume": row.volume,
+            "market_cap": row.market_cap,
+            "day_high": row.day_high,
+            "day_low": row.day_low,
+            "fifty_two_week_high": row.fifty_two_week_high,
+            "fifty_two_week_low": row.fifty_two_week_low,
+        }
+        for row in rows
     }
+    return quotes, fresh
+
+
+def cache_quotes(db: Session, quotes: List[Dict[str, Any]]):
+    """Insert or refresh cached real-time quotes with a single UPSERT"""
+    updated_at = datetime.now()
+    
+    rows = [
+        {
+            "index_id": quote["id"],
+            "symbol": quote["symbol"],
+            "name": quote["name"],
+            "country": quote["country"],
+            "current_price": quote["price"],
+            "previous_close": round(quote["price"] - quote["change"], 2),
+            "change": quote["change"],
+            "change_percent": quote["change_percent"],
+            "volume": quote["volume"],
+            "market_cap": quote["market_cap"],
+            "day_high": quote["day_high"],
+            "day_low": quote["day_low"],
+            "fifty_two_week_high": quote["fifty_two_week_high"],
+            "fifty_two_week_low": quote["fifty_two_week_low"],
+            "updated_at": updated_at
+        }
+        for quote in quotes
+    ]
+    
+    # updated_at is always refreshed: get_cached_quotes relies on it for freshness
+    stmt = insert(IndexQuoteCache).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[IndexQuoteCache.index_id],
+        set_={key: stmt.excluded[key] for key in rows[0] if key != "index_id"}
+    )
+    
+    db.execute(stmt)
+    db.commit()
 
 
+# ============== Sentiment History ==============
+
 def save_sentiment_history(
     db: Session,
     index_id: str,
@@ -188,35 +384,121 @@ def save_sentiment_history(
     return history
 
 
-def get_sentiment_trend(
+def get_sentiment_overview(
     db: Session,
     index_id: str,
     days: int = 7
-) -> List[Dict[str, Any]]:
-    """Get sentiment trend over time"""
+) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Get the latest valid sentiment and the sentiment trend in a single query
     
+    Rows are ranked newest-first with ROW_NUMBER(); only the newest row
+    carries its articles. Returns (latest, trend), where latest is None once
+    the newest analysis is older than the sentiment TTL.
+    """
+    index_id = index_id.upper()
     since = datetime.now() - timedelta(days=days)
+    rn = func.row_number().over(order_by=desc(SentimentHistory.analyzed_at))
     
-    history = db.query(SentimentHistory).filter(
-        and_(
-            SentimentHistory.index_id == index_id.upper(),
-            SentimentHistory.analyzed_at >= since
-        )
-    ).order_by(SentimentHistory.analyzed_at).all()
+    history = db.execute(
+        select(
+            SentimentHistory.analyzed_at,
+            SentimentHistory.overall_sentiment,
+            SentimentHistory.sentiment_score,
+            SentimentHistory.total_articles,
+            SentimentHistory.positive_count,
+            SentimentHistory.negative_count,
+            SentimentHistory.neutral_count,
+            case((rn == 1, SentimentHistory.articles), else_=None).label("articles")
+        ).where(
+            and_(
+                SentimentHistory.index_id == index_id,
+                SentimentHistory.analyzed_at >= since
+            )
+        ).order_by(desc(SentimentHistory.analyzed_at))
+    ).all()
     
-    return [
+    iso = datetime.isoformat
+    trend = [
         {
-            "date": h.analyzed_at.isoformat(),
+            "date": iso(h.analyzed_at),
             "sentiment": h.overall_sentiment,
             "score": h.sentiment_score,
             "article_count": h.total_articles
         }
-        for h in history
+        for h in reversed(history)
+    ]
+    
+    if not history or not is_cache_valid(history[0].analyzed_at, "sentiment"):
+        return None, trend
+    
+    latest = history[0]
+    sentiment = {
+        "score": latest.sentiment_score,
+        "label": latest.overall_sentiment,
+        "positive_count": latest.positive_count,
+        "negative_count": latest.negative_count,
+        "neutral_count": latest.neutral_count,
+        "articles": latest.articles or [],
+        "cached_at": trend[-1]["date"]
+    }
+    return sentiment, trend
+
+
+# ============== Headline Sentiment Cache ==============
+
+def headline_key(text: str) -> str:
+    """Cache key for a headline (fixed width regardless of headline length)"""
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def get_cached_headline_sentiments(db: Session, texts: List[str]) -> Dict[str, Tuple[str, float]]:
+    """Get valid cached (label, confidence) results for the given headlines, keyed by text"""
+    keys = {headline_key(text): text for text in texts}
+    cutoff = datetime.now() - _CACHE_TTL_DELTAS["headline_sentiment"]
+    
+    rows = db.execute(
+        select(HeadlineSentiment.headline_hash, HeadlineSentiment.sentiment, HeadlineSentiment.confidence)
+        .where(HeadlineSentiment.headline_hash.in_(keys), HeadlineSentiment.analyzed_at > cutoff)
+    ).all()
+    
+    return {keys[row.headline_hash]: (row.sentiment, row.confidence) for row in rows}
+
+
+def cache_headline_sentiments(db: Session, results: Dict[str, Tuple[str, float]]):
+    """Insert or refresh headline results with a single UPSERT, dropping expired ones"""
+    analyzed_at = datetime.now()
+    
+    rows = [
+        {
+            "headline_hash": headline_key(text),
+            "sentiment": label,
+            "confidence": confidence,
+            "analyzed_at": analyzed_at
+        }
+        for text, (label, confidence) in results.items()
     ]
+    
+    stmt = insert(HeadlineSentiment).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[HeadlineSentiment.headline_hash],
+        set_={key: stmt.excluded[key] for key in rows[0] if key != "headline_hash"}
+    )
+    db.execute(stmt)
+    
+    # Expired rows are never read again; the analyzed_at index keeps this cheap
+    db.execute(delete(HeadlineSentiment).where(
+        HeadlineSentiment.analyzed_at < analyzed_at - _CACHE_TTL_DELTAS["headline_sentiment"]
+    ))
+    db.commit()
 
 
 # ============== Prediction Logs ==============
 
+# Price points per UPDATE ... FROM (VALUES ...) statement when evaluating
+EVALUATE_BATCH_SIZE = 1000
+
+
 def log_prediction(
     db: Session,
     index_id: str,
@@ -224,22 +506,31 @@ def log_prediction(
 ):
     """Log a prediction for future accuracy tracking"""
     
-    # Log each predicted day
-    for pred in prediction_data.get("predictions", []):
-        log = PredictionLog(
-            index_id=index_id.upper(),
-            target_date=datetime.strptime(pred["date"], "%Y-%m-%d"),
-            prediction_days=prediction_data.get("prediction_days"),
-            current_price=prediction_data.get("current_price"),
-            predicted_price=pred.get("predicted_close"),
-            predicted_direction=prediction_data.get("predicted_direction"),
-            predicted_change_percent=prediction_data.get("predicted_change_percent"),
-            confidence=pred.get("confidence"),
-            technical_factors=prediction_data.get("factors", {}).get("technical"),
-            sentiment_factors=prediction_data.get("factors", {}).get("sentiment"),
-            combined_signal=prediction_data.get("factors", {}).get("combined_signal")
-        )
-        db.add(log)
+    # Fields shared by every predicted day
+    factors = prediction_data.get("factors", {})
+    shared = {
+        "index_id": index_id.upper(),
+        "prediction_days": prediction_data.get("prediction_days"),
+        "current_price": prediction_data.get("current_price"),
+        "predicted_direction": prediction_data.get("predicted_direction"),
+        "predicted_change_percent": prediction_data.get("predicted_change_percent"),
+        "technical_factors": factors.get("technical"),
+        "sentiment_factors": factors.get("sentiment"),
+        "combined_signal": factors.get("combined_signal")
+    }
+    
+    # Log each predicted day as a plain mapping, written in one batch
+    rows = [
+        {
+            **shared,
+            "target_date": datetime.fromisoformat(pred["date"]),
+            "predicted_price": pred.get("predicted_close"),
+            "confidence": pred.get("confidence")
+        }
+        for pred in prediction_data.get("predictions", [])
+    ]
+    if rows:
+        db.bulk_insert_mappings(PredictionLog, rows)
     
     db.commit()
 
@@ -249,21 +540,37 @@ def get_prediction_history(
     index_id: str,
     days: int = 30
 ) -> List[Dict[str, Any]]:
-    """Get prediction history for an index"""
+    """
+    Get prediction history for an index
+    
+    Only the columns returned to the client are selected, so the JSONB
+    factor columns are never fetched or decoded.
+    """
     
     since = datetime.now() - timedelta(days=days)
     
-    predictions = db.query(PredictionLog).filter(
+    predictions = db.query(
+        PredictionLog.prediction_date,
+        PredictionLog.target_date,
+        PredictionLog.predicted_price,
+        PredictionLog.actual_price,
+        PredictionLog.predicted_direction,
+        PredictionLog.actual_direction,
+        PredictionLog.confidence,
+        PredictionLog.was_correct,
+        PredictionLog.accuracy_score
+    ).filter(
         and_(
             PredictionLog.index_id == index_id.upper(),
             PredictionLog.prediction_date >= since
         )
     ).order_by(desc(PredictionLog.prediction_date)).limit(100).all()
     
+    iso = datetime.isoformat
     return [
         {
-            "prediction_date": p.prediction_date.isoformat(),
-            "target_date": p.target_date.isoformat(),
+            "prediction_date": iso(p.prediction_date),
+            "target_date": iso(p.target_date),
             "predicted_price": p.predicted_price,
             "actual_price": p.actual_price,
             "predicted_direction": p.predicted_direction,
@@ -276,70 +583,152 @@ def get_prediction_history(
     ]
 
 
-def evaluate_past_predictions(db: Session, index_id: str, actual_prices: Dict[str, float]):
-    """Evaluate past predictions with actual prices"""
+def evaluate_past_predictions(db: Session, index_id: str, price_points: List[Dict[str, Any]]):
+    """
+    Evaluate past predictions with actual prices
+    
+    Joins the pending predictions against the price points with
+    UPDATE ... FROM (VALUES ...) statements, one per batch of
+    EVALUATE_BATCH_SIZE points, and computes the outcome in SQL.
+    """
+    if not price_points:
+        return
+    
+    # fromisoformat parses in C; the date prefix drops any intraday time component
+    rows = [
+        (datetime.fromisoformat(point["date"][:10]), point["close"])
+        for point in price_points
+    ]
+    now = datetime.now()
+    
+    for start in range(0, len(rows), EVALUATE_BATCH_SIZE):
+        db.execute(_evaluation_update(index_id, rows[start:start + EVALUATE_BATCH_SIZE], now))
+    db.commit()
+
+
+def _evaluation_update(index_id: str, rows: List[Tuple[datetime, float]], now: datetime):
+    """Build the bulk UPDATE evaluating pending predictions against one batch of prices"""
+    prices = values(
+        column("target_date", DateTime),
+        column("price", Float),
+        name="actual_prices"
+    ).data(rows)
     
-    # Get unevaluated predictions for this index
-    pending = db.query(PredictionLog).filter(
+    actual = prices.c.price
+    current = PredictionLog.current_price
+    has_current = and_(current.isnot(None), current != 0)
+    
+    # Calculate actual change
+    actual_change = (actual - current) / current * 100
+    
+    # Determine actual direction
+    actual_direction = case(
+        (~has_current, None),
+        (actual_change > 0.5, "bullish"),
+        (actual_change < -0.5, "bearish"),
+        else_="neutral"
+    )
+    
+    # Check if prediction was correct
+    was_correct = case(
+        (~has_current, None),
+        (PredictionLog.predicted_direction == actual_direction, true()),
+        else_=false()
+    )
+    
+    # Calculate accuracy score (0-1, how close was the prediction; 10% error = 0 score)
+    error_percent = func.abs(PredictionLog.predicted_price - actual) / actual * 100
+    accuracy_score = case(
+        (~has_current, None),
+        (and_(PredictionLog.predicted_price.isnot(None), PredictionLog.predicted_price != 0),
+         case((error_percent > 10, 0.0), else_=1 - error_percent / 10.0)),
+        else_=None
+    )
+    
+    return update(PredictionLog).where(
         and_(
             PredictionLog.index_id == index_id.upper(),
+            PredictionLog.target_date == prices.c.target_date,
             PredictionLog.actual_price.is_(None),
-            PredictionLog.target_date <= datetime.now()
+            PredictionLog.target_date <= now
         )
-    ).all()
-    
-    for pred in pending:
-        date_str = pred.target_date.strftime("%Y-%m-%d")
-        if date_str in actual_prices:
-            actual = actual_prices[date_str]
-            pred.actual_price = actual
-            
-            # Calculate actual change
-            if pred.current_price:
-                actual_change = ((actual - pred.current_price) / pred.current_price) * 100
-                pred.actual_change_percent = actual_change
-                
-                # Determine actual direction
-                if actual_change > 0.5:
-                    pred.actual_direction = "bullish"
-                elif actual_change < -0.5:
-                    pred.actual_direction = "bearish"
-                else:
-                    pred.actual_direction = "neutral"
-                
-                # Check if prediction was correct
-                pred.was_correct = pred.predicted_direction == pred.actual_direction
-                
-                # Calculate accuracy score (0-1, how close was the prediction)
-                if pred.predicted_price:
-                    error_percent = abs(pred.predicted_price - actual) / actual * 100
-                    pred.accuracy_score = max(0, 1 - (error_percent / 10))  # 10% error = 0 score
-            
-            pred.evaluated_at = datetime.now()
-    
-    db.commit()
+    ).values(
+        actual_price=actual,
+        actual_change_percent=case((has_current, actual_change), else_=None),
+        actual_direction=actual_direction,
+        was_correct=was_correct,
+        accuracy_score=accuracy_score,
+        evaluated_at=now
+    ).execution_options(synchronize_session=False)
+
+
+def _accuracy_stats(total: int, correct: int, avg_accuracy: Optional[float], last_evaluated: Optional[datetime]) -> Dict[str, Any]:
+    """Format aggregated accuracy figures into the API response shape"""
+    return {
+        "total_predictions": total,
+        "correct_predictions": correct,
+        "direction_accuracy": round(correct / total * 100, 2),
+        "price_accuracy": round((avg_accuracy or 0) * 100, 2),
+        "last_evaluated": last_evaluated.isoformat() if last_evaluated else None
+    }
 
 
 def get_prediction_accuracy(db: Session, index_id: str) -> Dict[str, Any]:
     """Get overall prediction accuracy for an index"""
     
-    evaluated = db.query(PredictionLog).filter(
+    total, correct, avg_accuracy, last_evaluated = db.query(
+        func.count(PredictionLog.id),
+        func.sum(case((PredictionLog.was_correct == True, 1), else_=0)),
+        func.avg(func.coalesce(PredictionLog.accuracy_score, 0)),
+        func.max(PredictionLog.evaluated_at)
+    ).filter(
         and_(
             PredictionLog.index_id == index_id.upper(),
             PredictionLog.was_correct.isnot(None)
         )
-    ).all()
+    ).one()
     
-    if not evaluated:
+    if not total:
         return {"total_predictions": 0, "accuracy": None}
     
-    correct = sum(1 for p in evaluated if p.was_correct)
-    avg_accuracy = sum(p.accuracy_score or 0 for p in evaluated) / len(evaluated)
+    return _accuracy_stats(total, correct, avg_accuracy, last_evaluated)
+
+
+def get_prediction_accuracy_bulk(
+    db: Session,
+    index_ids: List[str]
+) -> Tuple[Dict[str, Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Get prediction accuracy for several indices in a single grouped query
     
-    return {
-        "total_predictions": len(evaluated),
-        "correct_predictions": correct,
-        "direction_accuracy": round(correct / len(evaluated) * 100, 2),
-        "price_accuracy": round(avg_accuracy * 100, 2),
-        "last_evaluated": max(p.evaluated_at for p in evaluated if p.evaluated_at).isoformat()
-    }
+    Returns the per-index stats (indices without evaluated predictions are
+    omitted) and the stats across all of them, or None if there are none.
+    GROUPING SETS returns the grand total (index_id IS NULL) from the same
+    scan as the per-index rows; like evaluate_past_predictions, this needs
+    PostgreSQL.
+    """
+    query = db.query(
+        PredictionLog.index_id,
+        func.count(PredictionLog.id),
+        func.sum(case((PredictionLog.was_correct == True, 1), else_=0)),
+        func.avg(func.coalesce(PredictionLog.accuracy_score, 0)),
+        func.max(PredictionLog.evaluated_at)
+    ).filter(
+        and_(
+            PredictionLog.index_id.in_([i.upper() for i in index_ids]),
+            PredictionLog.was_correct.isnot(None)
+        )
+    ).group_by(func.grouping_sets(tuple_(PredictionLog.index_id), tuple_()))
+    
+    by_index = {}
+    overall = None
+    for index_id, total, correct, avg_accuracy, last_evaluated in query.all():
+        if not total:
+            continue
+        stats = _accuracy_stats(total, int(correct or 0), avg_accuracy, last_evaluated)
+        if index_id is None:
+            overall = stats
+        else:
+            by_index[index_id] = stats
+    
+    return by_index, overall
@@ -2,10 +2,35 @@
 Service for fetching index/stock data using yfinance
 """
 import yfinance as yf
+import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
+from sqlalchemy.orm import Session
 from app.core.config import settings
+from app.services.cache_service import (
+    INTRADAY_INTERVALS,
+    INTRADAY_DATE_FORMAT,
+    DAILY_DATE_FORMAT,
+    CachedSeries,
+    get_cached_quotes,
+    cache_quotes,
+    get_cached_index_data,
+    cache_index_data
+)
+
+# In-process caches for quotes and summaries to avoid hitting Yahoo on every request
+_quotes_cache: Dict[str, Any] = {}
+_quotes_ttl = 20  # 20 seconds
+_summary_cache: Dict[str, Dict[str, Any]] = {}
+_summary_ttl = 300  # 5 minutes
+_quotes_timeout = 8  # Seconds to wait for all quotes before returning the ones that arrived
+
+# Long-lived workers for concurrent Yahoo calls. yfinance shares one curl_cffi
+# session whose curl handles (and their kept-alive TLS connections) are
+# per-thread, so reusing the same threads reuses the connections.
+_yahoo_executor = ThreadPoolExecutor(max_workers=len(settings.INDICES), thread_name_prefix="yahoo")
 
 
 def get_all_indices() -> List[Dict[str, str]]:
@@ -48,7 +73,8 @@ def fetch_index_data(
         interval: Data interval (1m, 5m, 15m, 30m, 1h, 1d, 1wk, 1mo)
     
     Returns:
-        Dictionary with index info and historical data
+        Dictionary with index info and historical data, as point dicts
+        ("data") and as NumPy arrays per field ("columns")
     """
     index_info = get_index_info(index_id)
     if not index_info:
@@ -63,31 +89,56 @@ def fetch_index_data(
         if hist.empty:
             return None
         
-        # Get current info
-        info = ticker.info
-        current_price = info.get("regularMarketPrice") or info.get("previousClose") or hist["Close"].iloc[-1]
-        previous_close = info.get("previousClose") or hist["Close"].iloc[-2] if len(hist) > 1 else current_price
+        # Get current quote (fast_info reads the lightweight chart endpoint, not the full .info blob)
+        quote = ticker.fast_info
+        current_price = quote.last_price or quote.regular_market_previous_close or hist["Close"].iloc[-1]
+        previous_close = quote.regular_market_previous_close or hist["Close"].iloc[-2] if len(hist) > 1 else current_price
         
         change = current_price - previous_close
         change_percent = (change / previous_close * 100) if previous_close else 0
         
-        # Format data for response
-        data = []
-        for idx, row in hist.iterrows():
-            date_str = idx.strftime("%Y-%m-%d %H:%M:%S") if interval in ["1m", "5m", "15m", "30m", "1h"] else idx.strftime("%Y-%m-%d")
-            
-            prev_close = data[-1]["close"] if data else row["Open"]
-            day_change = ((row["Close"] - prev_close) / prev_close * 100) if prev_close else 0
-            
-            data.append({
+        # Format data for response (column-wise rather than row by row)
+        date_format = INTRADAY_DATE_FORMAT if interval in INTRADAY_INTERVALS else DAILY_DATE_FORMAT
+        raw_closes = hist["Close"].to_numpy()
+        closes = np.round(raw_closes, 2)
+        
+        # Each day's change is against the previous (rounded) close, or the open for the first day
+        prev_closes = np.empty_like(closes)
+        prev_closes[0] = hist["Open"].iloc[0]
+        prev_closes[1:] = closes[:-1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            day_changes = np.where(prev_closes != 0, (raw_closes - prev_closes) / prev_closes * 100, 0)
+        
+        # Contiguous column arrays for numeric consumers (e.g. technical indicators)
+        columns = {
+            "open": hist["Open"].round(2).to_numpy(),
+            "high": hist["High"].round(2).to_numpy(),
+            "low": hist["Low"].round(2).to_numpy(),
+            "close": closes,
+            "volume": hist["Volume"].to_numpy(dtype=np.int64),
+            "change_percent": np.round(day_changes, 2)
+        }
+        
+        data = [
+            {
                 "date": date_str,
-                "open": round(row["Open"], 2),
-                "high": round(row["High"], 2),
-                "low": round(row["Low"], 2),
-                "close": round(row["Close"], 2),
-                "volume": int(row["Volume"]),
-                "change_percent": round(day_change, 2)
-            })
+                "open": open_,
+                "high": high,
+                "low": low,
+                "close": close,
+                "volume": volume,
+                "change_percent": day_change
+            }
+            for date_str, open_, high, low, close, volume, day_change in zip(
+                hist.index.strftime(date_format).tolist(),
+                columns["open"].tolist(),
+                columns["high"].tolist(),
+                columns["low"].tolist(),
+                columns["close"].tolist(),
+                columns["volume"].tolist(),
+                columns["change_percent"].tolist()
+            )
+        ]
         
         return {
             "index_id": index_info["id"],
@@ -99,7 +150,8 @@ def fetch_index_data(
             "current_price": round(current_price, 2),
             "change": round(change, 2),
             "change_percent": round(change_percent, 2),
-            "data": data
+            "data": data,
+            "columns": columns
         }
         
     except Exception as e:
@@ -107,70 +159,164 @@ def fetch_index_data(
         return None
 
 
-def fetch_realtime_quotes() -> List[Dict[str, Any]]:
-    """Fetch real-time quotes for all indices"""
-    quotes = []
+def get_index_history(
+    db: Session,
+    index_id: str,
+    period: str = "1mo",
+    interval: str = "1d"
+) -> Optional[CachedSeries]:
+    """
+    Get historical data for an index through the database cache
     
-    for idx_id, info in settings.INDICES.items():
+    Falls back to fetch_index_data on a miss and caches the result. The
+    returned series carries fetched_at, which the API uses as an ETag.
+    """
+    index_info = get_index_info(index_id)
+    if not index_info:
+        return None
+    
+    series = get_cached_index_data(db, index_info["id"], period, interval)
+    if series is not None:
+        return series
+    
+    data = fetch_index_data(index_id, period=period, interval=interval)
+    if not data:
+        return None
+    
+    quote = {
+        "current_price": data["current_price"],
+        "change": data["change"],
+        "change_percent": data["change_percent"]
+    }
+    try:
+        return cache_index_data(db, data["index_id"], data["symbol"], period, interval, data["data"], quote=quote)
+    except Exception as e:
+        db.rollback()
+        print(f"Warning: Failed to cache index data: {e}")
+        return CachedSeries.from_points(data["data"], datetime.now(), quote)
+
+
+def fetch_realtime_quotes(db: Optional[Session] = None) -> List[Dict[str, Any]]:
+    """
+    Fetch real-time quotes for all indices
+    
+    Served from the in-process cache first, then per index from the database
+    quote cache (when a session is given); only indices without a fresh
+    cached quote are fetched from Yahoo Finance.
+    """
+    now = datetime.now().timestamp()
+    if _quotes_cache and now - _quotes_cache["timestamp"] < _quotes_ttl:
+        return _quotes_cache["quotes"]
+    
+    cached, fresh = get_cached_quotes(db) if db is not None else ({}, set())
+    
+    stale = {idx_id: info for idx_id, info in settings.INDICES.items() if idx_id not in fresh}
+    fetched = _fetch_quotes_from_yahoo(stale) if stale else {}
+    if db is not None and fetched:
         try:
-            ticker = yf.Ticker(info["symbol"])
-            ticker_info = ticker.info
-            
-            current_price = ticker_info.get("regularMarketPrice") or ticker_info.get("previousClose", 0)
-            previous_close = ticker_info.get("previousClose", current_price)
-            
-            change = current_price - previous_close
-            change_percent = (change / previous_close * 100) if previous_close else 0
-            
-            quotes.append({
-                "id": idx_id,
-                "name": info["name"],
-                "symbol": info["symbol"],
-                "country": info["country"],
-                "price": round(current_price, 2),
-                "change": round(change, 2),
-                "change_percent": round(change_percent, 2),
-                "volume": ticker_info.get("regularMarketVolume", 0),
-                "market_cap": ticker_info.get("marketCap"),
-                "day_high": ticker_info.get("dayHigh"),
-                "day_low": ticker_info.get("dayLow"),
-                "fifty_two_week_high": ticker_info.get("fiftyTwoWeekHigh"),
-                "fifty_two_week_low": ticker_info.get("fiftyTwoWeekLow"),
-            })
+            cache_quotes(db, list(fetched.values()))
         except Exception as e:
-            print(f"Error fetching quote for {idx_id}: {e}")
-            continue
+            db.rollback()
+            print(f"Warning: Failed to cache quotes: {e}")
+    
+    # Indices that timed out or failed keep their last cached quote
+    quotes = [fetched.get(idx_id) or cached.get(idx_id) for idx_id in settings.INDICES]
+    quotes = [quote for quote in quotes if quote]
     
+    # Only a complete set is reused in-process; otherwise the next request retries the gaps
+    if len(quotes) == len(settings.INDICES):
+        _quotes_cache["quotes"] = quotes
+        _quotes_cache["timestamp"] = now
     return quotes
 
 
+def _fetch_quotes_from_yahoo(indices: Dict[str, Dict[str, str]]) -> Dict[str, Dict[str, Any]]:
+    """Fetch quotes for the given indices from Yahoo Finance concurrently, keyed by index id"""
+    # Each quote is an independent blocking HTTP call, so overlap them
+    futures = {
+        idx_id: _yahoo_executor.submit(_fetch_quote, idx_id, info)
+        for idx_id, info in indices.items()
+    }
+    
+    # Don't let a single slow index hold up the rest
+    done, pending = wait(futures.values(), timeout=_quotes_timeout)
+    if pending:
+        print(f"Warning: {len(pending)} quote request(s) timed out")
+    
+    quotes = {idx_id: future.result() for idx_id, future in futures.items() if future in done}
+    return {idx_id: quote for idx_id, quote in quotes.items() if quote}
+
+
+def _fetch_quote(idx_id: str, info: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    """Fetch the real-time quote for a single index"""
+    try:
+        ticker = yf.Ticker(info["symbol"])
+        quote = ticker.fast_info
+        
+        current_price = quote.last_price or quote.regular_market_previous_close or 0
+        previous_close = quote.regular_market_previous_close or current_price
+        
+        change = current_price - previous_close
+        change_percent = (change / previous_close * 100) if previous_close else 0
+        
+        return {
+            "id": idx_id,
+            "name": info["name"],
+            "symbol": info["symbol"],
+            "country": info["country"],
+            "price": round(current_price, 2),
+            "change": round(change, 2),
+            "change_percent": round(change_percent, 2),
+            "volume": quote.last_volume or 0,
+            # Indices have no share count, so Yahoo reports no market cap for them;
+            # fast_info.market_cap would only fall back to the full .info request
+            "market_cap": None,
+            "day_high": quote.day_high,
+            "day_low": quote.day_low,
+            "fifty_two_week_high": quote.year_high,
+            "fifty_two_week_low": quote.year_low,
+        }
+    except Exception as e:
+        print(f"Error fetching quote for {idx_id}: {e}")
+        return None
+
+
 def get_index_summary(index_id: str) -> Optional[Dict[str, Any]]:
     """Get detailed summary for an index"""
     index_info = get_index_info(index_id)
     if not index_info:
         return None
     
+    cached = _summary_cache.get(index_info["id"])
+    if cached and datetime.now().timestamp() - cached["timestamp"] < _summary_ttl:
+        return cached["summary"]
+    
     try:
         ticker = yf.Ticker(index_info["symbol"])
-        info = ticker.info
+        quote = ticker.fast_info
         
-        return {
+        summary = {
             "id": index_info["id"],
             "name": index_info["name"],
             "symbol": index_info["symbol"],
             "country": index_info["country"],
-            "current_price": info.get("regularMarketPrice"),
-            "previous_close": info.get("previousClose"),
-            "open": info.get("regularMarketOpen"),
-            "day_high": info.get("dayHigh"),
-            "day_low": info.get("dayLow"),
-            "volume": info.get("regularMarketVolume"),
-            "avg_volume": info.get("averageVolume"),
-            "fifty_two_week_high": info.get("fiftyTwoWeekHigh"),
-            "fifty_two_week_low": info.get("fiftyTwoWeekLow"),
-            "fifty_day_avg": info.get("fiftyDayAverage"),
-            "two_hundred_day_avg": info.get("twoHundredDayAverage"),
+            "current_price": quote.last_price,
+            "previous_close": quote.regular_market_previous_close,
+            "open": quote.open,
+            "day_high": quote.day_high,
+            "day_low": quote.day_low,
+            "volume": quote.last_volume,
+            "avg_volume": quote.three_month_average_volume,
+            "fifty_two_week_high": quote.year_high,
+            "fifty_two_week_low": quote.year_low,
+            "fifty_day_avg": quote.fifty_day_average,
+            "two_hundred_day_avg": quote.two_hundred_day_average,
+        }
+        _summary_cache[index_info["id"]] = {
+            "summary": summary,
+            "timestamp": datetime.now().timestamp()
         }
+        return summary
     except Exception as e:
         print(f"Error fetching summary for {index_id}: {e}")
         return None
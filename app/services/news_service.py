@@ -3,14 +3,23 @@ Service for fetching news articles
 """
 import requests
 import os
-from typing import List, Dict, Any
+import random
+import threading
+import time
+from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
+from cachetools import TLRUCache
 
 NEWS_API_KEY = os.getenv("NEWS_API_KEY", "")
 
-# Cache for news to avoid hitting API limits
-_news_cache: Dict[str, Dict[str, Any]] = {}
-_cache_ttl = 300  # 5 minutes
+# Cache for news to avoid hitting API limits (news changes slowly)
+_cache_ttl = int(os.getenv("NEWS_CACHE_TTL", "900"))  # 15 minutes
+_refresh_after = 0.8 * _cache_ttl  # Refresh entries in the background past this age
+
+# Bounded LRU with a per-entry TTL, jittered by +/-10% so entries don't expire together
+_news_cache = TLRUCache(maxsize=512, ttu=lambda key, value, now: now + value["ttl"], timer=time.monotonic)
+_news_lock = threading.Lock()
+_refreshing: set = set()
 
 
 def fetch_news(query: str, page_size: int = 10) -> List[Dict[str, Any]]:
@@ -24,17 +33,37 @@ def fetch_news(query: str, page_size: int = 10) -> List[Dict[str, Any]]:
     Returns:
         List of article dictionaries
     """
-    # Check cache
-    cache_key = f"{query}_{page_size}"
-    if cache_key in _news_cache:
-        cached = _news_cache[cache_key]
-        if datetime.now().timestamp() - cached["timestamp"] < _cache_ttl:
-            return cached["articles"]
+    # Check cache (NewsAPI search is case-insensitive, so normalize the key)
+    cache_key = f"{query.strip().lower()}_{page_size}"
+    with _news_lock:
+        cached = _news_cache.get(cache_key)
+        stale = cached is not None and time.monotonic() - cached["fetched_at"] > _refresh_after
+        if stale and cache_key not in _refreshing:
+            _refreshing.add(cache_key)
+        else:
+            stale = False
+    
+    if cached is not None:
+        if stale:
+            threading.Thread(
+                target=_refresh_news, args=(query, page_size, cache_key), daemon=True
+            ).start()
+        return cached["articles"]
     
     if not NEWS_API_KEY or NEWS_API_KEY == "your_newsapi_key_here":
         # Return mock data if no API key
         return _get_mock_news(query)
     
+    articles = _request_news(query, page_size)
+    if articles is None:
+        return _get_mock_news(query)
+    
+    _store_news(cache_key, articles)
+    return articles
+
+
+def _request_news(query: str, page_size: int) -> Optional[List[Dict[str, Any]]]:
+    """Call NewsAPI, returning None on failure"""
     try:
         url = "https://newsapi.org/v2/everything"
         params = {
@@ -49,54 +78,60 @@ def fetch_news(query: str, page_size: int = 10) -> List[Dict[str, Any]]:
         
         if response.status_code == 200:
             data = response.json()
-            articles = data.get("articles", [])
-            
-            # Cache the results
-            _news_cache[cache_key] = {
-                "articles": articles,
-                "timestamp": datetime.now().timestamp()
-            }
-            
-            return articles
+            return data.get("articles", [])
         else:
             print(f"NewsAPI error: {response.status_code}")
-            return _get_mock_news(query)
+            return None
             
     except Exception as e:
         print(f"Error fetching news: {e}")
-        return _get_mock_news(query)
+        return None
+
+
+def _store_news(cache_key: str, articles: List[Dict[str, Any]]):
+    """Cache articles with a jittered TTL"""
+    with _news_lock:
+        _news_cache[cache_key] = {
+            "articles": articles,
+            "fetched_at": time.monotonic(),
+            "ttl": _cache_ttl * random.uniform(0.9, 1.1)
+        }
+
+
+def _refresh_news(query: str, page_size: int, cache_key: str):
+    """Refresh-ahead: re-fetch an entry nearing expiry off the request path"""
+    try:
+        articles = _request_news(query, page_size)
+        if articles is not None:
+            _store_news(cache_key, articles)
+    finally:
+        with _news_lock:
+            _refreshing.discard(cache_key)
+
+
+# Mock news template rows, built once: (index, headline word, source, age)
+_MOCK_WORDS = ("rally", "surge", "gains", "optimism", "growth", "decline", "fall", "concerns")
+_MOCK_SOURCES = ("Reuters", "Bloomberg", "CNBC", "Financial Times", "WSJ", "MarketWatch", "Yahoo Finance", "Economic Times")
+_MOCK_ROWS = tuple(
+    (i, word, {"name": source}, timedelta(hours=i * 2))
+    for i, (word, source) in enumerate(zip(_MOCK_WORDS, _MOCK_SOURCES))
+)
 
 
 def _get_mock_news(query: str) -> List[Dict[str, Any]]:
     """
     Return mock news data for testing without API key
     """
-    # Generate varied mock news based on query
-    sentiments = [
-        ("rally", "positive"),
-        ("surge", "positive"),
-        ("gains", "positive"),
-        ("optimism", "positive"),
-        ("growth", "positive"),
-        ("decline", "negative"),
-        ("fall", "negative"),
-        ("concerns", "negative"),
-        ("volatility", "negative"),
-        ("uncertainty", "neutral"),
-        ("stable", "neutral"),
-        ("mixed signals", "neutral"),
-    ]
-    
-    mock_articles = []
     base_time = datetime.now()
     
-    for i, (word, _) in enumerate(sentiments[:8]):
-        mock_articles.append({
+    return [
+        {
             "title": f"{query} markets show {word} amid global economic shifts",
-            "source": {"name": ["Reuters", "Bloomberg", "CNBC", "Financial Times", "WSJ", "MarketWatch", "Yahoo Finance", "Economic Times"][i % 8]},
-            "publishedAt": (base_time - timedelta(hours=i*2)).isoformat(),
+            "source": dict(source),
+            "publishedAt": (base_time - age).isoformat(),
             "url": f"https://example.com/news/{i}",
-            "description": f"Analysis of {query} performance showing {word} patterns..."
-        })
-    
-    return mock_articles
+            "description": f"Analysis of {query} performance showing {word} patterns...",
+            "mock": True
+        }
+        for i, word, source, age in _MOCK_ROWS
+    ]
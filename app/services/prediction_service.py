@@ -1,39 +1,77 @@
 """
 Prediction service combining technical analysis with sentiment
 """
+import math
+import threading
 import numpy as np
+from cachetools import TTLCache
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Optional, Tuple
 from app.services.index_service import fetch_index_data, get_index_info
 from app.services.news_service import fetch_news
-from app.services.sentiment_service import analyze_sentiment
+from app.services.sentiment_service import LABEL_CODES, analyze_sentiment_batch
 
+# Long-lived workers so the per-query news requests run concurrently
+_news_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="news")
 
-def calculate_technical_indicators(data: List[Dict]) -> Dict[str, float]:
-    """Calculate technical indicators from price data"""
-    if len(data) < 20:
+# Runs a prediction's sentiment stage (news fetch + FinBERT) alongside its price
+# stage. Kept apart from _news_executor, whose tasks this stage waits on.
+_sentiment_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="sentiment")
+
+# Aggregate sentiment per index; news moves slowly, so forecasts within the window share it
+_sentiment_ttl = 600  # 10 minutes
+_sentiment_cache = TTLCache(maxsize=64, ttl=_sentiment_ttl)
+_sentiment_lock = threading.Lock()
+
+# Related news search terms per index (at most two are added to the index name)
+_MARKET_TERMS = {
+    "NIFTY50": ("NSE India", "Indian stock market"),
+    "SENSEX": ("BSE India", "Bombay Stock Exchange"),
+    "SP500": ("S&P 500", "US stock market"),
+    "NASDAQ": ("NASDAQ", "tech stocks"),
+    "DOWJONES": ("Dow Jones", "US blue chips"),
+    "NIKKEI225": ("Nikkei", "Japan stocks"),
+    "FTSE100": ("FTSE", "London Stock Exchange"),
+}
+
+# Noise source for forecast paths (PCG64 Generator rather than the global RandomState)
+_rng = np.random.default_rng()
+
+# Annualization factor for daily volatility (trading days per year)
+_SQRT_252 = math.sqrt(252)
+
+
+def calculate_technical_indicators(closes: np.ndarray) -> Dict[str, float]:
+    """Calculate technical indicators from an array of closing prices"""
+    if len(closes) < 20:
         return {"trend": 0, "momentum": 0, "volatility": 0}
     
-    closes = np.array([d["close"] for d in data])
+    deltas = np.diff(closes)
+    returns = deltas / closes[:-1]
+    
+    # Reduce to scalars up front; everything after is plain float arithmetic,
+    # which avoids per-op NumPy scalar dispatch on these small series
+    last_close = float(closes[-1])
+    close_5 = float(closes[-5])
     
     # Simple Moving Averages
-    sma_5 = np.mean(closes[-5:])
-    sma_20 = np.mean(closes[-20:])
+    sma_5 = float(closes[-5:].mean())
+    sma_20 = float(closes[-20:].mean())
     
     # Trend: SMA crossover signal (-1 to 1)
     trend = (sma_5 - sma_20) / sma_20 if sma_20 else 0
     trend = max(min(trend * 10, 1), -1)  # Normalize to -1 to 1
     
     # Momentum: Rate of change
-    roc = (closes[-1] - closes[-5]) / closes[-5] if closes[-5] else 0
+    roc = (last_close - close_5) / close_5 if close_5 else 0
     momentum = max(min(roc * 5, 1), -1)
     
     # Volatility: Standard deviation of returns
-    returns = np.diff(closes) / closes[:-1]
-    volatility = np.std(returns) * np.sqrt(252) if len(returns) > 1 else 0
+    volatility = float(returns.std()) * _SQRT_252 if len(returns) > 1 else 0
     
-    # RSI (14-period)
-    rsi = calculate_rsi(closes, 14)
+    # RSI (14-period), from the same price deltas
+    rsi = calculate_rsi(deltas, 14)
     
     return {
         "trend": round(trend, 4),
@@ -42,85 +80,74 @@ def calculate_technical_indicators(data: List[Dict]) -> Dict[str, float]:
         "rsi": round(rsi, 2),
         "sma_5": round(sma_5, 2),
         "sma_20": round(sma_20, 2),
-        "current_price": round(closes[-1], 2)
+        "current_price": round(last_close, 2)
     }
 
 
-def calculate_rsi(closes: np.ndarray, period: int = 14) -> float:
-    """Calculate Relative Strength Index"""
-    if len(closes) < period + 1:
+def calculate_rsi(deltas: np.ndarray, period: int = 14) -> float:
+    """Calculate Relative Strength Index from consecutive price deltas"""
+    if len(deltas) < period:
         return 50.0
     
-    deltas = np.diff(closes)
-    gains = np.where(deltas > 0, deltas, 0)
-    losses = np.where(deltas < 0, -deltas, 0)
-    
-    avg_gain = np.mean(gains[-period:])
-    avg_loss = np.mean(losses[-period:])
+    # Average gain/loss share the period divisor, so sums give the same ratio. The
+    # window is only `period` values, so one scalar pass beats separate array reductions.
+    gains = losses = 0.0
+    for delta in deltas[-period:].tolist():
+        if delta > 0:
+            gains += delta
+        else:
+            losses -= delta
     
-    if avg_loss == 0:
+    if losses == 0:
         return 100.0
     
-    rs = avg_gain / avg_loss
+    rs = gains / losses
     rsi = 100 - (100 / (1 + rs))
     
     return rsi
 
 
 def get_sentiment_analysis(index_id: str) -> Dict[str, Any]:
-    """Analyze news sentiment for an index"""
+    """Analyze news sentiment for an index (cached briefly per index)"""
     index_info = get_index_info(index_id)
     if not index_info:
         return {"score": 0, "label": "neutral", "articles": []}
     
-    # Create search queries based on index
-    queries = [index_info["name"]]
-    
-    # Add related terms based on index
-    market_terms = {
-        "NIFTY50": ["NSE India", "Indian stock market", "Nifty"],
-        "SENSEX": ["BSE India", "Bombay Stock Exchange", "Sensex"],
-        "SP500": ["S&P 500", "US stock market", "Wall Street"],
-        "NASDAQ": ["NASDAQ", "tech stocks", "US technology"],
-        "DOWJONES": ["Dow Jones", "US blue chips"],
-        "NIKKEI225": ["Nikkei", "Japan stocks", "Tokyo Stock Exchange"],
-        "FTSE100": ["FTSE", "London Stock Exchange", "UK stocks"],
-    }
+    with _sentiment_lock:
+        cached = _sentiment_cache.get(index_info["id"])
+    if cached is not None:
+        return _copy_sentiment(cached)
     
-    if index_id.upper() in market_terms:
-        queries.extend(market_terms[index_id.upper()][:2])
+    sentiment, cacheable = _analyze_news_sentiment(index_info)
+    if cacheable:
+        with _sentiment_lock:
+            _sentiment_cache[index_info["id"]] = _copy_sentiment(sentiment)
+    return sentiment
+
+
+def _copy_sentiment(sentiment: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy a sentiment result so callers can't mutate the cached one"""
+    return {**sentiment, "articles": [dict(article) for article in sentiment["articles"]]}
+
+
+def _analyze_news_sentiment(index_info: Dict[str, str]) -> Tuple[Dict[str, Any], bool]:
+    """
+    Fetch and score the news for an index
     
-    all_results = []
+    Also returns whether the result is worth caching: it isn't when there
+    was no news or it came from the mock fallback (no API key or a failed
+    NewsAPI call), so the next request tries for real news again.
+    """
+    # Search queries: the index name plus its related market terms
+    queries = (index_info["name"], *_MARKET_TERMS.get(index_info["id"], ()))
     
-    for query in queries[:2]:  # Limit queries
-        articles = fetch_news(query)
-        
-        for article in articles:
-            if article.get("title"):
-                sentiment = analyze_sentiment(article["title"])
-                
-                # Convert sentiment to score (-1 to 1)
-                label = sentiment["sentiment"].lower()
-                confidence = sentiment["confidence"]
-                
-                if label == "positive":
-                    score = confidence
-                elif label == "negative":
-                    score = -confidence
-                else:
-                    score = 0
-                
-                all_results.append({
-                    "headline": article["title"],
-                    "source": article.get("source", {}).get("name"),
-                    "published_at": article.get("publishedAt"),
-                    "url": article.get("url"),
-                    "sentiment": label,
-                    "confidence": confidence,
-                    "score": round(score, 4)
-                })
-    
-    if not all_results:
+    # Fetch all queries concurrently; aliased queries (e.g. "S&P 500" for SP500) only once
+    queries = queries[:2]  # Limit queries
+    unique_queries = list(dict.fromkeys(queries))
+    feeds = dict(zip(unique_queries, _news_executor.map(fetch_news, unique_queries)))
+    articles = [article for query in queries for article in feeds[query] if article.get("title")]
+    
+    if not articles:
         return {
             "score": 0,
             "label": "neutral",
@@ -128,14 +155,41 @@ def get_sentiment_analysis(index_id: str) -> Dict[str, Any]:
             "negative_count": 0,
             "neutral_count": 0,
             "articles": []
-        }
+        }, False
+    
+    # Overlapping feeds repeat headlines; score each distinct title once in one batched call
+    titles = list(dict.fromkeys(article["title"] for article in articles))
+    sentiments = dict(zip(titles, analyze_sentiment_batch(titles)))
     
-    # Calculate aggregate sentiment
-    avg_score = np.mean([r["score"] for r in all_results])
+    all_results = []
+    scores = []
+    label_codes = []
+    
+    for article in articles:
+        # Convert sentiment to score (-1 to 1)
+        sentiment = sentiments[article["title"]]
+        label = sentiment["sentiment"].lower()
+        confidence = sentiment["confidence"]
+        code = LABEL_CODES.get(label, 0)
+        score = round(code * confidence, 4) if code else 0
+        
+        scores.append(score)
+        label_codes.append(code)
+        all_results.append({
+            "headline": article["title"],
+            "source": article.get("source", {}).get("name"),
+            "published_at": article.get("publishedAt"),
+            "url": article.get("url"),
+            "sentiment": label,
+            "confidence": confidence,
+            "score": score
+        })
     
-    positive_count = sum(1 for r in all_results if r["sentiment"] == "positive")
-    negative_count = sum(1 for r in all_results if r["sentiment"] == "negative")
-    neutral_count = sum(1 for r in all_results if r["sentiment"] == "neutral")
+    # Calculate aggregate sentiment (counts indexed negative, neutral, positive)
+    avg_score = float(np.fromiter(scores, dtype=np.float64, count=len(scores)).mean())
+    negative_count, neutral_count, positive_count = np.bincount(
+        np.fromiter(label_codes, dtype=np.int8, count=len(label_codes)) + 1, minlength=3
+    ).tolist()
     
     if avg_score > 0.1:
         label = "positive"
@@ -151,7 +205,7 @@ def get_sentiment_analysis(index_id: str) -> Dict[str, Any]:
         "negative_count": negative_count,
         "neutral_count": neutral_count,
         "articles": all_results
-    }
+    }, not any(article.get("mock") for article in articles)
 
 
 def generate_prediction(
@@ -168,19 +222,31 @@ def generate_prediction(
     Returns:
         Prediction data including forecasted prices
     """
-    # Fetch historical data
-    index_data = fetch_index_data(index_id, period="3mo", interval="1d")
+    # Unknown indices have no price data either; don't start news work for them
+    if not get_index_info(index_id):
+        return None
+    
+    # Sentiment doesn't depend on prices, so run it in the background
+    sentiment_future = _sentiment_executor.submit(get_sentiment_analysis, index_id)
+    
+    # Fetch historical data; drop the sentiment job if there is nothing to predict
+    try:
+        index_data = fetch_index_data(index_id, period="3mo", interval="1d")
+    except Exception:
+        sentiment_future.cancel()
+        raise
     if not index_data or not index_data["data"]:
+        sentiment_future.cancel()
         return None
     
     historical = index_data["data"]
     current_price = index_data["current_price"]
     
     # Calculate technical indicators
-    technicals = calculate_technical_indicators(historical)
+    technicals = calculate_technical_indicators(index_data["columns"]["close"])
     
     # Get sentiment analysis
-    sentiment = get_sentiment_analysis(index_id)
+    sentiment = sentiment_future.result()
     
     # Combine signals for prediction
     # Weights: Technical (60%), Sentiment (40%)
@@ -206,34 +272,34 @@ def generate_prediction(
     
     # Calculate predicted change (conservative estimate)
     volatility = technicals.get("volatility", 0.15)
-    max_daily_change = volatility / np.sqrt(252) * 2  # 2 sigma move
+    max_daily_change = volatility / _SQRT_252 * 2  # 2 sigma move
     
     base_change = combined_signal * max_daily_change * 100
     
-    # Generate predictions for each day
-    predictions = []
-    cumulative_change = 0
+    # Generate predictions for all days at once
+    steps = np.arange(1, days + 1)
+    today = datetime.now()
     
-    for i in range(1, days + 1):
-        # Add some randomness and mean reversion
-        daily_change = base_change * (0.9 ** i)  # Decay factor
-        noise = np.random.normal(0, max_daily_change * 0.3)
-        
-        cumulative_change += (daily_change + noise * 100)
-        
-        predicted_price = current_price * (1 + cumulative_change / 100)
-        
-        # Confidence decreases with time
-        day_confidence = max(0.3, 0.85 - (i * 0.07))
-        
-        future_date = datetime.now() + timedelta(days=i)
-        
-        predictions.append({
-            "date": future_date.strftime("%Y-%m-%d"),
+    # Decaying signal plus noise, accumulated into a price path
+    noise = _rng.standard_normal(days) * (max_daily_change * 0.3)
+    daily_changes = base_change * (0.9 ** steps) + noise * 100
+    predicted_prices = current_price * (1 + np.cumsum(daily_changes) / 100)
+    
+    # Confidence decreases with time
+    day_confidences = np.maximum(0.3, 0.85 - steps * 0.07)
+    
+    sentiment_influence = round(sent_signal * 0.4, 4)
+    predictions = [
+        {
+            "date": (today + timedelta(days=i)).strftime("%Y-%m-%d"),
             "predicted_close": round(predicted_price, 2),
             "confidence": round(day_confidence, 2),
-            "sentiment_influence": round(sent_signal * 0.4, 4)
-        })
+            "sentiment_influence": sentiment_influence
+        }
+        for i, predicted_price, day_confidence in zip(
+            steps.tolist(), predicted_prices.tolist(), day_confidences.tolist()
+        )
+    ]
     
     # Calculate overall prediction
     final_prediction = predictions[-1]["predicted_close"]
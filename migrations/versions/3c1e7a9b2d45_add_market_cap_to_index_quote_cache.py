@@ -0,0 +1,28 @@
+"""Add market_cap to index_quote_cache and widen volume
+
+Revision ID: 3c1e7a9b2d45
+Revises: 872a616e100d
+Create Date: 2026-10-15 09:12:31.418230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1e7a9b2d45'
+down_revision: Union[str, None] = '872a616e100d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('index_quote_cache', sa.Column('market_cap', sa.Float(), nullable=True))
+    op.alter_column('index_quote_cache', 'volume', type_=sa.BigInteger(), existing_type=sa.Integer(), existing_nullable=True)
+
+
+def downgrade() -> None:
+    op.alter_column('index_quote_cache', 'volume', type_=sa.Integer(), existing_type=sa.BigInteger(), existing_nullable=True)
+    op.drop_column('index_quote_cache', 'market_cap')
@@ -0,0 +1,39 @@
+"""Partial covering index for pending predictions
+
+Revision ID: 8f4d2b6c1a97
+Revises: 3c1e7a9b2d45
+Create Date: 2026-10-15 10:03:47.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f4d2b6c1a97'
+down_revision: Union[str, None] = '3c1e7a9b2d45'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.drop_index('idx_prediction_pending', table_name='prediction_logs', postgresql_concurrently=True)
+        op.create_index(
+            'idx_prediction_pending',
+            'prediction_logs',
+            ['index_id', 'target_date'],
+            unique=False,
+            postgresql_concurrently=True,
+            postgresql_where=sa.text('actual_price IS NULL'),
+            postgresql_include=['id', 'current_price', 'predicted_price', 'predicted_direction'],
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('idx_prediction_pending', table_name='prediction_logs', postgresql_concurrently=True)
+        op.create_index('idx_prediction_pending', 'prediction_logs', ['actual_price'], unique=False, postgresql_concurrently=True)
@@ -0,0 +1,30 @@
+"""Add quote fields to cached index batches
+
+Revision ID: a9e1c5d73b08
+Revises: f3b8d6a2c471
+Create Date: 2026-10-15 13:47:05.118293
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9e1c5d73b08'
+down_revision: Union[str, None] = 'f3b8d6a2c471'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('cached_index_batches', sa.Column('current_price', sa.Float(), nullable=True))
+    op.add_column('cached_index_batches', sa.Column('change', sa.Float(), nullable=True))
+    op.add_column('cached_index_batches', sa.Column('change_percent', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('cached_index_batches', 'change_percent')
+    op.drop_column('cached_index_batches', 'change')
+    op.drop_column('cached_index_batches', 'current_price')
@@ -0,0 +1,48 @@
+"""Use JSONB for prediction factors with a GIN index
+
+Revision ID: b5e9c3f07d12
+Revises: 8f4d2b6c1a97
+Create Date: 2026-10-15 11:26:08.553907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e9c3f07d12'
+down_revision: Union[str, None] = '8f4d2b6c1a97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.alter_column('prediction_logs', 'technical_factors',
+               existing_type=sa.JSON(),
+               type_=postgresql.JSONB(astext_type=sa.Text()),
+               existing_nullable=True,
+               postgresql_using='technical_factors::jsonb')
+    op.alter_column('prediction_logs', 'sentiment_factors',
+               existing_type=sa.JSON(),
+               type_=postgresql.JSONB(astext_type=sa.Text()),
+               existing_nullable=True,
+               postgresql_using='sentiment_factors::jsonb')
+    op.create_index('idx_prediction_sentiment_factors', 'prediction_logs', ['sentiment_factors'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'sentiment_factors': 'jsonb_path_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('idx_prediction_sentiment_factors', table_name='prediction_logs',
+                  postgresql_using='gin', postgresql_ops={'sentiment_factors': 'jsonb_path_ops'})
+    op.alter_column('prediction_logs', 'sentiment_factors',
+               existing_type=postgresql.JSONB(astext_type=sa.Text()),
+               type_=sa.JSON(),
+               existing_nullable=True,
+               postgresql_using='sentiment_factors::json')
+    op.alter_column('prediction_logs', 'technical_factors',
+               existing_type=postgresql.JSONB(astext_type=sa.Text()),
+               type_=sa.JSON(),
+               existing_nullable=True,
+               postgresql_using='technical_factors::json')
@@ -0,0 +1,38 @@
+"""Add headline sentiment cache
+
+Revision ID: c6f2e8a4d917
+Revises: a9e1c5d73b08
+Create Date: 2026-10-15 15:12:40.527391
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6f2e8a4d917'
+down_revision: Union[str, None] = 'a9e1c5d73b08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('headline_sentiments',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('headline_hash', sa.String(length=40), nullable=False),
+    sa.Column('sentiment', sa.String(length=20), nullable=False),
+    sa.Column('confidence', sa.Float(), nullable=False),
+    sa.Column('analyzed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('headline_hash')
+    )
+    op.create_index(op.f('ix_headline_sentiments_id'), 'headline_sentiments', ['id'], unique=False)
+    op.create_index(op.f('ix_headline_sentiments_analyzed_at'), 'headline_sentiments', ['analyzed_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_headline_sentiments_analyzed_at'), table_name='headline_sentiments')
+    op.drop_index(op.f('ix_headline_sentiments_id'), table_name='headline_sentiments')
+    op.drop_table('headline_sentiments')
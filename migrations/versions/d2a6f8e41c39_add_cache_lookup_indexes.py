@@ -0,0 +1,30 @@
+"""Add composite indexes for cache and history lookups
+
+Revision ID: d2a6f8e41c39
+Revises: b5e9c3f07d12
+Create Date: 2026-10-15 11:52:41.207318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a6f8e41c39'
+down_revision: Union[str, None] = 'b5e9c3f07d12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_index('idx_index_period', table_name='cached_index_data')
+    op.create_index('idx_index_period_fetched', 'cached_index_data', ['index_id', 'period', 'interval', 'fetched_at'], unique=False)
+    op.create_index('idx_prediction_index_date', 'prediction_logs', ['index_id', 'prediction_date'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_prediction_index_date', table_name='prediction_logs')
+    op.drop_index('idx_index_period_fetched', table_name='cached_index_data')
+    op.create_index('idx_index_period', 'cached_index_data', ['index_id', 'period', 'interval'], unique=False)
@@ -0,0 +1,49 @@
+"""Add columnar cached index batches
+
+Revision ID: f3b8d6a2c471
+Revises: d2a6f8e41c39
+Create Date: 2026-10-15 13:08:52.419736
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b8d6a2c471'
+down_revision: Union[str, None] = 'd2a6f8e41c39'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('cached_index_batches',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('index_id', sa.String(length=50), nullable=False),
+    sa.Column('symbol', sa.String(length=20), nullable=False),
+    sa.Column('period', sa.String(length=10), nullable=False),
+    sa.Column('interval', sa.String(length=10), nullable=False),
+    sa.Column('points', sa.Integer(), nullable=False),
+    sa.Column('dates', sa.LargeBinary(), nullable=False),
+    sa.Column('opens', sa.LargeBinary(), nullable=False),
+    sa.Column('highs', sa.LargeBinary(), nullable=False),
+    sa.Column('lows', sa.LargeBinary(), nullable=False),
+    sa.Column('closes', sa.LargeBinary(), nullable=False),
+    sa.Column('volumes', sa.LargeBinary(), nullable=False),
+    sa.Column('changes', sa.LargeBinary(), nullable=False),
+    sa.Column('fetched_at', sa.DateTime(), nullable=True),
+    sa.Column('fingerprint', sa.String(length=16), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_batch_config', 'cached_index_batches', ['index_id', 'period', 'interval'], unique=True)
+    op.create_index(op.f('ix_cached_index_batches_id'), 'cached_index_batches', ['id'], unique=False)
+    op.alter_column('cached_index_data', 'volume', type_=sa.BigInteger(), existing_type=sa.Integer(), existing_nullable=True)
+
+
+def downgrade() -> None:
+    op.alter_column('cached_index_data', 'volume', type_=sa.Integer(), existing_type=sa.BigInteger(), existing_nullable=True)
+    op.drop_index(op.f('ix_cached_index_batches_id'), table_name='cached_index_batches')
+    op.drop_index('idx_batch_config', table_name='cached_index_batches')
+    op.drop_table('cached_index_batches')
@@ -0,0 +1,29 @@
+"""
+Shared fixtures: services run against a throwaway SQLite database
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Must be set before app.core.database creates its engine
+_db_file = Path(tempfile.mkdtemp()) / "test.db"
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_file}"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.database import Base, SessionLocal, engine  # noqa: E402
+import app.models.db_models  # noqa: E402,F401
+
+
+@pytest.fixture
+def db():
+    """A session on freshly created tables"""
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
@@ -0,0 +1,105 @@
+"""
+Tests for the database cache service
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, select, update
+
+from app.core.database import engine
+from app.models.db_models import CachedIndexBatch, IndexQuoteCache
+from app.services import cache_service
+from app.services.cache_service import (
+    cache_index_data,
+    cache_quotes,
+    get_cached_index_data,
+    get_cached_quotes,
+)
+
+
+def _quote(index_id="SP500", price=5000.0):
+    return {
+        "id": index_id,
+        "name": "S&P 500",
+        "symbol": "^GSPC",
+        "country": "USA",
+        "price": price,
+        "change": 10.0,
+        "change_percent": 0.2,
+        "volume": 1000,
+        "market_cap": None,
+        "day_high": price + 5,
+        "day_low": price - 5,
+        "fifty_two_week_high": price + 100,
+        "fifty_two_week_low": price - 100,
+    }
+
+
+def _bars(closes):
+    return [
+        {
+            "date": f"2024-01-{day:02d}",
+            "open": close - 1,
+            "high": close + 2,
+            "low": close - 2,
+            "close": close,
+            "volume": 1000 + day,
+            "change_percent": 0.1,
+        }
+        for day, close in enumerate(closes, start=1)
+    ]
+
+
+def _age_quotes(db, seconds):
+    db.execute(update(IndexQuoteCache).values(updated_at=datetime.now() - timedelta(seconds=seconds)))
+    db.commit()
+
+
+def test_fresh_quotes_are_served(db):
+    cache_quotes(db, [_quote()])
+    
+    quotes, fresh = get_cached_quotes(db)
+    
+    assert fresh == {"SP500"}
+    assert quotes["SP500"]["price"] == 5000.0
+
+
+def test_quotes_older_than_realtime_window_miss(db):
+    cache_quotes(db, [_quote()])
+    _age_quotes(db, 30)
+    
+    quotes, fresh = get_cached_quotes(db)
+    
+    assert fresh == set()
+    assert "SP500" in quotes  # Still available as a fallback
+
+
+def test_unchanged_index_data_only_refreshes_batch(db):
+    cache_index_data(db, "SP500", "^GSPC", "1mo", "1d", _bars([100.0, 101.0, 102.0]))
+    
+    statements = []
+    
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        cache_index_data(db, "SP500", "^GSPC", "1mo", "1d", _bars([100.0, 101.0, 102.0]))
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    
+    assert not any(statement.startswith("INSERT") for statement in statements)
+    assert any(statement.startswith("UPDATE cached_index_batches") for statement in statements)
+
+
+def test_revised_earlier_bar_is_written(db):
+    cache_index_data(db, "SP500", "^GSPC", "1mo", "1d", _bars([100.0, 101.0, 102.0]))
+    first = db.scalar(select(CachedIndexBatch.fingerprint))
+    
+    # Same length and same last bar; only the first close is revised
+    cache_index_data(db, "SP500", "^GSPC", "1mo", "1d", _bars([99.5, 101.0, 102.0]))
+    db.expire_all()
+    
+    assert db.scalar(select(CachedIndexBatch.fingerprint)) != first
+    cache_service._l1_index_data.clear()
+    series = get_cached_index_data(db, "SP500", "1mo", "1d")
+    assert series[0]["close"] == 99.5
@@ -0,0 +1,53 @@
+"""
+Tests for the history API routes
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app.api.history import get_sentiment_history
+from app.models.db_models import SentimentHistory
+from app.services.cache_service import save_sentiment_history
+
+
+def _sentiment(label="positive", score=0.4):
+    return {
+        "label": label,
+        "score": score,
+        "positive_count": 2,
+        "negative_count": 0,
+        "neutral_count": 1,
+        "articles": [{"headline": "Stocks rally", "sentiment": label, "score": score}],
+    }
+
+
+def test_sentiment_history_is_empty_without_analyses(db):
+    response = get_sentiment_history("SP500", days=7, db=db)
+
+    assert response["data"] == []
+    assert response["latest"] is None
+
+
+def test_sentiment_history_includes_fresh_latest(db):
+    save_sentiment_history(db, "SP500", "S&P 500", _sentiment("negative", -0.2))
+    db.execute(update(SentimentHistory).values(analyzed_at=datetime.now() - timedelta(hours=2)))
+    save_sentiment_history(db, "SP500", "S&P 500", _sentiment("positive", 0.4))
+
+    response = get_sentiment_history("SP500", days=7, db=db)
+
+    assert [point["sentiment"] for point in response["data"]] == ["negative", "positive"]
+    assert response["average_score"] == 0.1
+    assert response["current_sentiment"] == "positive"
+    assert response["latest"]["label"] == "positive"
+    assert response["latest"]["articles"][0]["headline"] == "Stocks rally"
+
+
+def test_stale_latest_is_omitted(db):
+    save_sentiment_history(db, "SP500", "S&P 500", _sentiment())
+    db.execute(update(SentimentHistory).values(analyzed_at=datetime.now() - timedelta(hours=2)))
+    db.commit()
+
+    response = get_sentiment_history("SP500", days=7, db=db)
+
+    assert response["total_analyses"] == 1
+    assert response["latest"] is None
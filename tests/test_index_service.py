@@ -0,0 +1,85 @@
+"""
+Tests for real-time quote fetching through the quote cache
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.models.db_models import IndexQuoteCache
+from app.services import index_service
+from app.services.cache_service import cache_quotes, get_cached_quotes
+
+
+def _quote(idx_id, price):
+    info = settings.INDICES[idx_id]
+    return {
+        "id": idx_id,
+        "name": info["name"],
+        "symbol": info["symbol"],
+        "country": info["country"],
+        "price": price,
+        "change": 1.0,
+        "change_percent": 0.1,
+        "volume": 0,
+        "market_cap": None,
+        "day_high": None,
+        "day_low": None,
+        "fifty_two_week_high": None,
+        "fifty_two_week_low": None,
+    }
+
+
+@pytest.fixture(autouse=True)
+def clear_quotes_cache():
+    index_service._quotes_cache.clear()
+    yield
+    index_service._quotes_cache.clear()
+
+
+def test_only_stale_indices_are_fetched(db, monkeypatch):
+    cache_quotes(db, [_quote(idx_id, 100.0) for idx_id in settings.INDICES])
+    db.execute(update(IndexQuoteCache).where(IndexQuoteCache.index_id == "SP500").values(
+        updated_at=datetime.now() - timedelta(seconds=30)
+    ))
+    db.commit()
+    
+    requested = []
+    monkeypatch.setattr(index_service, "_fetch_quote", lambda idx_id, info: requested.append(idx_id) or _quote(idx_id, 200.0))
+    
+    quotes = {quote["id"]: quote for quote in index_service.fetch_realtime_quotes(db)}
+    
+    assert requested == ["SP500"]
+    assert quotes["SP500"]["price"] == 200.0
+    assert quotes["NIFTY50"]["price"] == 100.0
+    assert get_cached_quotes(db)[1] == set(settings.INDICES)
+
+
+def test_failed_index_keeps_last_cached_quote(db, monkeypatch):
+    cache_quotes(db, [_quote(idx_id, 100.0) for idx_id in settings.INDICES])
+    db.execute(update(IndexQuoteCache).values(updated_at=datetime.now() - timedelta(seconds=30)))
+    db.commit()
+    
+    monkeypatch.setattr(
+        index_service, "_fetch_quote",
+        lambda idx_id, info: None if idx_id == "DAX" else _quote(idx_id, 200.0)
+    )
+    
+    quotes = {quote["id"]: quote for quote in index_service.fetch_realtime_quotes(db)}
+    
+    assert len(quotes) == len(settings.INDICES)
+    assert quotes["DAX"]["price"] == 100.0
+    assert quotes["SP500"]["price"] == 200.0
+
+
+def test_incomplete_set_is_not_cached_in_process(monkeypatch):
+    monkeypatch.setattr(
+        index_service, "_fetch_quote",
+        lambda idx_id, info: None if idx_id == "DAX" else _quote(idx_id, 200.0)
+    )
+    
+    quotes = index_service.fetch_realtime_quotes()
+    
+    assert len(quotes) == len(settings.INDICES) - 1
+    assert not index_service._quotes_cache